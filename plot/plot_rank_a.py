@@ -1,8 +1,8 @@
 import os
-import pickle
 import numpy as np
 import matplotlib.pyplot as plt
 from omegaconf import OmegaConf
+from src.store import open_results
 
 
 def main(exp_name, save_path="plot_rank_a.pdf"):
@@ -10,11 +10,10 @@ def main(exp_name, save_path="plot_rank_a.pdf"):
     config_path = os.path.join("results", "outputs", exp_name, "config.yaml")
     config = OmegaConf.load(config_path)
     results_path = os.path.join("results", "outputs", exp_name, "results.pkl")
-    with open(results_path, "rb") as f:
-        results = pickle.load(f)
-    true_ranks = results["true_ranks"]
-    error_mean = results["error_mean"]
-    names = results["names"]
+    with open_results(results_path) as results:
+        names = results.names
+        true_ranks = results.get("true_ranks")
+        error_mean = {names[0]: results.get("error_mean", names[0])}
     n = config.data.n
     ### End of loading ###
 
@@ -1,9 +1,11 @@
 import os
-import pickle
 import matplotlib.pyplot as plt
 from omegaconf import OmegaConf
 import numpy as np
+from plot.utils import load_curve, markevery, set_x_axis, X_AXES
+from src.store import open_results
 from src.rank import GoRankEstimate
+from src.history import snapshot_times
 
 
 def main(exp_names, save_path="plot_rank_b.pdf"):
@@ -24,46 +26,49 @@ def main(exp_names, save_path="plot_rank_b.pdf"):
     markers = ["^", "o", "s"]
     ### End of plot config ###
 
+    ends = []
     for exp_name, color, marker in zip(exp_names, colors, markers):
 
         ### Load the configuration and results ###
         config_path = os.path.join("results", "outputs", exp_name, "config.yaml")
         config = OmegaConf.load(config_path)
         results_path = os.path.join("results", "outputs", exp_name, "results.pkl")
-        with open(results_path, "rb") as f:
-            results = pickle.load(f)
-        mean_relative_error = results["mean_relative_error"]
-        std_relative_error = results["std_relative_error"]
         horizon = config.experiment.horizon
         n = config.data.n
         graph_type = config.graph
-        timesteps = np.arange(horizon)
-        estimate = GoRankEstimate(horizon, n, np.zeros(n))
+        axis = OmegaConf.select(config, "plot.x_axis") or "steps"
+        estimate = GoRankEstimate(
+            horizon, n, np.zeros(n), snapshot_times(horizon, "none")
+        )
+        # only the curves of GoRank are read
+        with open_results(results_path) as results:
+            timesteps, mean, lower, upper = load_curve(
+                results, estimate.name, horizon, axis
+            )
         ### End of loading ###
+        end = horizon if axis == "steps" else timesteps[-1]
+        ends.append(end)
 
         ax.plot(
             timesteps,
-            mean_relative_error[estimate.name],
+            mean,
             marker=marker,
             color=color,
             label=graph_type,
-            markevery=range(horizon // 10, horizon, horizon // 10),
+            markevery=markevery(timesteps, end),
             markersize=6,
         )
         ax.fill_between(
             timesteps,
-            mean_relative_error[estimate.name] - std_relative_error[estimate.name],
-            mean_relative_error[estimate.name] + std_relative_error[estimate.name],
+            lower,
+            upper,
             color=color,
             alpha=0.3,
         )
     ax.set_ylim(0.0, 0.2)
-    ax.set_xlim(0, horizon)
-    ticks = np.linspace(0, horizon, 5, dtype=int)
-    ax.set_xticks(ticks)
-    ax.set_xticklabels([0] + [f"{t/1e4:.0f}e4" for t in ticks[1:]])
+    set_x_axis(ax, axis, max(ends))
     ax.set_yticks(np.linspace(0, 0.2, 5))
-    plt.title("Absolute Error vs. Timesteps", fontsize=fontsize)
+    plt.title(f"Absolute Error vs. {X_AXES[axis][1]}", fontsize=fontsize)
     plt.legend()
     plot_path = os.path.join("results", "figures", save_path)
     plt.savefig(plot_path, format="pdf", bbox_inches="tight")
@@ -1,8 +1,9 @@
 import os
-import pickle
 import matplotlib.pyplot as plt
 from omegaconf import OmegaConf
 import numpy as np
+from plot.utils import load_curve, markevery, set_x_axis, X_AXES
+from src.store import open_results
 
 
 def main(exp_name, save_path="plot_rank_c.pdf"):
@@ -10,12 +11,12 @@ def main(exp_name, save_path="plot_rank_c.pdf"):
     config_path = os.path.join("results", "outputs", exp_name, "config.yaml")
     config = OmegaConf.load(config_path)
     results_path = os.path.join("results", "outputs", exp_name, "results.pkl")
-    with open(results_path, "rb") as f:
-        results = pickle.load(f)
-    mean_relative_error = results["mean_relative_error"]
-    std_relative_error = results["std_relative_error"]
     horizon = config.experiment.horizon
-    timesteps = np.arange(horizon)
+    axis = OmegaConf.select(config, "plot.x_axis") or "steps"
+    with open_results(results_path) as results:
+        curves = {
+            name: load_curve(results, name, horizon, axis) for name in results.names
+        }
     ### End of loading ###
 
     ### Plot config ###
@@ -33,34 +34,34 @@ def main(exp_name, save_path="plot_rank_c.pdf"):
     )
     colors = ["C0", "C1", "C7"]
     markers = ["^", "o", "s"]
+    # the curves end at the horizon, or at their last x value on other axes
+    end = horizon if axis == "steps" else max(x[-1] for x, *_ in curves.values())
     ### End of plot config ###
 
-    for name, color, marker in zip(mean_relative_error.keys(), colors, markers):
+    for name, color, marker in zip(curves.keys(), colors, markers):
         print(name)
+        timesteps, mean, lower, upper = curves[name]
         ax.plot(
             timesteps,
-            mean_relative_error[name],
+            mean,
             marker=marker,
             color=color,
             label=name,
-            markevery=range(horizon // 10, horizon, horizon // 10),
+            markevery=markevery(timesteps, end),
             markersize=6,
         )
         ax.fill_between(
             timesteps,
-            mean_relative_error[name] - std_relative_error[name],
-            mean_relative_error[name] + std_relative_error[name],
+            lower,
+            upper,
             color=color,
             alpha=0.3,
         )
 
     ax.set_ylim(0.0, 0.5)
-    ax.set_xlim(0, horizon)
-    ticks = np.linspace(0, horizon, 5, dtype=int)
-    ax.set_xticks(ticks)
-    ax.set_xticklabels([0] + [f"{t/1e4:.0f}e4" for t in ticks[1:]])
+    set_x_axis(ax, axis, end)
     ax.set_yticks(np.linspace(0, 0.5, 6))
-    plt.title("Absolute Error vs. Timesteps", fontsize=fontsize)
+    plt.title(f"Absolute Error vs. {X_AXES[axis][1]}", fontsize=fontsize)
     plt.legend()
     plot_path = os.path.join("results", "figures", save_path)
     plt.savefig(plot_path, format="pdf", bbox_inches="tight")
@@ -1,8 +1,9 @@
 import os
-import pickle
 import matplotlib.pyplot as plt
 from omegaconf import OmegaConf
 import numpy as np
+from plot.utils import load_curve, markevery, set_x_axis, X_AXES
+from src.store import open_results
 from scipy.stats import trim_mean
 
 
@@ -11,17 +12,17 @@ def main(exp_name, save_path="plot_trim_b.pdf"):
     config_path = os.path.join("results", "outputs", exp_name, "config.yaml")
     config = OmegaConf.load(config_path)
     results_path = os.path.join("results", "outputs", exp_name, "results.pkl")
-    with open(results_path, "rb") as f:
-        results = pickle.load(f)
-    mean_relative_error = results["mean_relative_error"]
-    std_relative_error = results["std_relative_error"]
-    data = results["data"]
     horizon = config.experiment.horizon
+    axis = OmegaConf.select(config, "plot.x_axis") or "steps"
+    with open_results(results_path) as results:
+        curves = {
+            name: load_curve(results, name, horizon, axis) for name in results.names
+        }
+        data = results.get("data")
     # n = config.data.n
-    timesteps = np.arange(horizon)
     alpha = config.trimming.alpha
     trimmed_mean = trim_mean(data, alpha)
-    print("Corrupted mean", np.mean(data))
+    print("Corrupted mean", np.mean(data, axis=0))
     print("Robust mean", trimmed_mean)
     ### End of loading ###
 
@@ -40,34 +41,34 @@ def main(exp_name, save_path="plot_trim_b.pdf"):
     )
     colors = ["C0", "C1", "C7"]
     markers = ["^", "o", "s"]
+    # the curves end at the horizon, or at their last x value on other axes
+    end = horizon if axis == "steps" else max(x[-1] for x, *_ in curves.values())
     ### End of plot config ###
 
-    for name, color, marker in zip(mean_relative_error.keys(), colors, markers):
+    for name, color, marker in zip(curves.keys(), colors, markers):
         last_name = name
+        timesteps, mean, lower, upper = curves[name]
         ax.plot(
             timesteps,
-            mean_relative_error[name],
+            mean,
             marker=marker,
             color=color,
             label=name,
-            markevery=range(horizon // 10, horizon, horizon // 10),
+            markevery=markevery(timesteps, end),
             markersize=6,
         )
         ax.fill_between(
             timesteps,
-            mean_relative_error[name] - std_relative_error[name],
-            mean_relative_error[name] + std_relative_error[name],
+            lower,
+            upper,
             color=color,
             alpha=0.3,
         )
 
-    max_list = [
-        np.max(mean_relative_error[name]) for name in mean_relative_error.keys()
-    ]
-    original_error = np.mean(data) - trimmed_mean
-    min_list = [
-        np.min(mean_relative_error[name]) for name in mean_relative_error.keys()
-    ]
+    max_list = [np.max(curves[name][1]) for name in curves.keys()]
+    # error of the corrupted mean, averaged over the signals as the curves
+    original_error = np.mean(np.abs(np.mean(data, axis=0) - trimmed_mean))
+    min_list = [np.min(curves[name][1]) for name in curves.keys()]
     ax.set_ylim(
         max(0, 0.9 * min(min_list)), max(0.9 * np.max(max_list), 1.1 * original_error)
     )
@@ -77,11 +78,8 @@ def main(exp_name, save_path="plot_trim_b.pdf"):
         linestyle="--",
         label="Error of the corrupted mean",
     )
-    ax.set_xlim(0, horizon)
-    ticks = np.linspace(0, horizon, 5, dtype=int)
-    ax.set_xticks(ticks)
-    ax.set_xticklabels([0] + [f"{t/1e4:.0f}e4" for t in ticks[1:]])
-    plt.title("Absolute Error vs. Timesteps", fontsize=fontsize)
+    set_x_axis(ax, axis, end)
+    plt.title(f"Absolute Error vs. {X_AXES[axis][1]}", fontsize=fontsize)
     plt.legend()
     plot_path = os.path.join("results", "figures", save_path)
     plt.savefig(plot_path, format="pdf", bbox_inches="tight")
@@ -1,8 +1,8 @@
 import os
-import pickle
 import numpy as np
 import matplotlib.pyplot as plt
 from omegaconf import OmegaConf
+from src.store import open_results
 
 
 def main(exp_name, save_path="plot_trim_a.pdf"):
@@ -10,12 +10,15 @@ def main(exp_name, save_path="plot_trim_a.pdf"):
     config_path = os.path.join("results", "outputs", exp_name, "config.yaml")
     config = OmegaConf.load(config_path)
     results_path = os.path.join("results", "outputs", exp_name, "results.pkl")
-    with open(results_path, "rb") as f:
-        results = pickle.load(f)
-    true_ranks = results["true_ranks"]
-    error_mean = results["error_mean"]
-    names = results["names"]
-    n = len(results["data"])
+    with open_results(results_path) as results:
+        names = results.names
+        true_ranks = results.get("true_ranks")
+        error_mean = {names[0]: results.get("error_mean", names[0])}
+    n = len(true_ranks)
+    # with several signals, the errors of all signals are plotted against
+    # their ranks, since the bound only depends on the rank
+    true_ranks = true_ranks.ravel()
+    error_mean = {name: error.ravel() for name, error in error_mean.items()}
     alpha = config.trimming.alpha
     ### End of loading ###
 
@@ -0,0 +1,91 @@
+import numpy as np
+import os
+from src.history import history_path
+from src.decimate import decimate, LOD_KEYS
+
+
+def load_timesteps(results, horizon):
+    """Time steps of the error curves, which may only be recorded sparsely."""
+    return results.get("timesteps") if "timesteps" in results else np.arange(horizon)
+
+
+def load_activations(results, horizon):
+    """
+    Mean number of edge activations at the time steps of the error curves.
+    Rounds of the matching engine activate a whole matching; otherwise
+    each step activates one edge.
+    """
+    if "activations" in results:
+        return results.get("activations")
+    return load_timesteps(results, horizon)
+
+
+def load_clock(results, horizon):
+    """
+    Mean continuous time at the time steps of the error curves, for edges
+    activated by Poisson clocks; otherwise the time steps themselves.
+    """
+    if "clock" in results:
+        return results.get("clock")
+    return load_timesteps(results, horizon)
+
+
+# x axes of the error curves (config key plot.x_axis), with their loader
+# and label
+X_AXES = {
+    "steps": (load_timesteps, "Timesteps"),
+    "activations": (load_activations, "Edge Activations"),
+    "time": (load_clock, "Time"),
+}
+
+
+def load_curve(results, name, horizon, axis="steps"):
+    """
+    x values, mean error and band (mean ± std) of the error curve of
+    estimator `name`, decimated for plotting, with x in time steps or
+    along another x axis of X_AXES. The decimated curves saved with the
+    results are used when available, so the full curves are not read.
+    """
+    load_x = X_AXES[axis][0]
+    if LOD_KEYS[0] in results:
+        x, mean, lower, upper = (results.get(key, name) for key in LOD_KEYS)
+        if axis != "steps":
+            # the decimated curves keep points at some of the time steps
+            indices = np.searchsorted(load_timesteps(results, horizon), x)
+            x = load_x(results, horizon)[indices]
+        return x, mean, lower, upper
+    return decimate(
+        load_x(results, horizon),
+        results.get("mean_relative_error", name),
+        results.get("std_relative_error", name),
+    )
+
+
+def set_x_axis(ax, axis, end):
+    """
+    Limits of the x axis, from 0 to `end`, with the ticks of the paper
+    figures for time steps.
+    """
+    ax.set_xlim(0, end)
+    if axis == "steps":
+        ticks = np.linspace(0, end, 5, dtype=int)
+        ax.set_xticks(ticks)
+        ax.set_xticklabels([0] + [f"{t/1e4:.0f}e4" for t in ticks[1:]])
+
+
+def markevery(x, end):
+    """Indices of the curve points closest to ten evenly spaced x values."""
+    marks = np.searchsorted(x, np.linspace(0, end, 11)[1:-1])
+    return np.unique(np.minimum(marks, len(x) - 1))
+
+
+def load_history(exp_name, trial, name):
+    """
+    Snapshot times and values of a history recorded on disk, e.g.
+    load_history("exp", 0, "GoRankEstimate_ranking"). The values are mapped
+    lazily, so only the slices used are read.
+    """
+    folder = os.path.join("results", "outputs", exp_name, "history")
+    times = np.load(os.path.join(folder, "times.npy"))
+    values = np.load(f"{history_path(folder, trial, name)}.npy", mmap_mode="r")
+    return times, values
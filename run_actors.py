@@ -0,0 +1,62 @@
+import asyncio
+import argparse
+import json
+import os
+import numpy as np
+from src.actors import gossip_runtime
+from src.graph import generate_graph
+from src.schedule import clock_rates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50, help="Number of nodes")
+    parser.add_argument("--graph", type=str, default="Watts-Strogatz")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duration", type=float, default=10, help="In seconds")
+    parser.add_argument(
+        "--rate", type=float, default=20, help="Wake-ups per second of a node"
+    )
+    parser.add_argument(
+        "--slow_fraction", type=float, default=0, help="Fraction of slow nodes"
+    )
+    parser.add_argument(
+        "--slow_rate", type=float, default=0.1, help="Relative rate of slow nodes"
+    )
+    parser.add_argument("--transport", type=str, default="queue", help="queue or tcp")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Trimming level")
+    parser.add_argument("--every", type=float, default=0.1, help="Sampling period")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = rng.permutation(np.arange(1, args.n + 1)).astype(float)
+    graph = generate_graph(args.n, args.graph, args.seed)
+    rates = args.rate * clock_rates(args.n, args.slow_fraction, args.slow_rate, rng)
+    report = asyncio.run(
+        gossip_runtime(
+            graph,
+            data,
+            args.duration,
+            rates,
+            args.transport,
+            args.alpha,
+            args.every,
+            args.seed,
+        )
+    )
+    report["config"] = vars(args)
+    latency = report["latency_ms"]
+    print(f"Exchanges: {report['exchanges']} ({report['throughput']:.0f}/s)")
+    print(f"Latency: mean {latency['mean']:.3f} ms, p99 {latency['p99']:.3f} ms")
+    print(f"Rank error: {report['curve']['rank_error'][-1]:.2e}")
+    print(f"GoTrim error: {report['curve']['mean_error'][-1]:.2e}")
+
+    path = os.path.join("results", "actors")
+    os.makedirs(path, exist_ok=True)
+    name = f"{args.graph}_{args.n}_{args.transport}.json"
+    with open(os.path.join(path, name), "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
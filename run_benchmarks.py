@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from src.graph import generate_graph, GRAPH_TYPES
+from src.history import snapshot_times, history_path
+from src.rank import (
+    GoRankEstimate,
+    GoRankEstimateAsync,
+    ImprovedBaselineEstimate,
+    BaselineEstimate,
+)
+from src.schedule import EdgeSchedule
+from src.trim import MeanEstimate, ClippedGossip
+
+RANK_CLASSES = [
+    GoRankEstimate,
+    GoRankEstimateAsync,
+    ImprovedBaselineEstimate,
+    BaselineEstimate,
+]
+ESTIMATORS = [cls.__name__ for cls in RANK_CLASSES] + [
+    "MeanEstimate_GoRankEstimate",
+    "MeanEstimate_ImprovedBaselineEstimate",
+    "ClippedGossip",
+]
+
+
+def make_estimate(name, horizon, n, data, times, path, alpha, tau):
+    """Estimator `name`, named as in the history files of run_experiments."""
+    rank_classes = {cls.__name__: cls for cls in RANK_CLASSES}
+    if name in rank_classes:
+        return rank_classes[name](horizon, n, data, times, path)
+    elif name.startswith("MeanEstimate_"):
+        rank_class = rank_classes[name[len("MeanEstimate_") :]]
+        return MeanEstimate(horizon, n, data, alpha, rank_class, times, path)
+    elif name == "ClippedGossip":
+        return ClippedGossip(horizon, n, data, tau, times, path)
+    raise ValueError("Wrong estimator.")
+
+
+def run(estimate, pairs):
+    """Update an estimate along the edges `pairs`, as the loop engine does."""
+    if hasattr(estimate, "update"):
+        for t, (i, j) in enumerate(pairs, start=1):
+            estimate.update(t, i, j)
+    elif isinstance(estimate, MeanEstimate):
+        for t, (i, j) in enumerate(pairs, start=1):
+            estimate.rank.update(t, i, j)
+            estimate.update_mean(t, i, j)
+    else:
+        for t, (i, j) in enumerate(pairs, start=1):
+            estimate.update_mean(t, i, j)
+
+
+def benchmark(name, graph, graph_type, data, steps, history, args):
+    """
+    Steps per second of the updates of an estimator over `steps` uniformly
+    drawn edges (best of `args.repeat` runs), and the peak memory allocated
+    by the estimator and its updates, measured in a separate run since
+    tracemalloc slows down the updates. The edges only depend on the seed,
+    the size and the type of the graph, so that a case gets the same edges
+    whichever other cases are run.
+    """
+    n = graph.number_of_nodes()
+    rng = np.random.default_rng([args.seed, n, GRAPH_TYPES.index(graph_type)])
+    pairs = EdgeSchedule.sample(graph.edges, steps - 1, rng).pairs.tolist()
+    times = snapshot_times(steps, history, every=args.history_every)
+
+    def new_estimate(folder):
+        path = history_path(folder, 0, name) if history != "none" else None
+        return make_estimate(name, steps, n, data, times, path, args.alpha, args.tau)
+
+    seconds = []
+    with tempfile.TemporaryDirectory() as folder:
+        for _ in range(args.repeat):
+            estimate = new_estimate(folder)
+            start = time.perf_counter()
+            run(estimate, pairs)
+            seconds.append(time.perf_counter() - start)
+            del estimate
+        tracemalloc.start()
+        estimate = new_estimate(folder)
+        run(estimate, pairs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del estimate
+    return {
+        "estimator": name,
+        "graph": graph_type,
+        "n": n,
+        "history": history,
+        "steps": steps,
+        "seconds": min(seconds),
+        "steps_per_second": (steps - 1) / min(seconds),
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def case_key(result):
+    return f"{result['estimator']}|{result['graph']}|{result['n']}|{result['history']}"
+
+
+def compare(results, baseline, tolerance, slack=1.0):
+    """
+    Cases slower than the baseline by more than a fraction `tolerance`, or
+    using more memory by more than a fraction `tolerance` plus `slack` MB
+    (so that the small allocations of small graphs are not flagged).
+    """
+    previous = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None:
+            continue
+        speed = result["steps_per_second"] / before["steps_per_second"]
+        memory = result["peak_memory_mb"] - before["peak_memory_mb"]
+        slower = speed < 1 - tolerance
+        larger = memory > tolerance * before["peak_memory_mb"] + slack
+        print(
+            f"{case_key(result)}: speed x{speed:.2f}, memory {memory:+.2f} MB"
+            + (" REGRESSION" if slower or larger else "")
+        )
+        flag = slower or larger
+        if flag:
+            regressions.append(case_key(result))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, nargs="+", default=[100, 500, 1000, 5000])
+    parser.add_argument(
+        "--graph", type=str, nargs="+", choices=GRAPH_TYPES, default=GRAPH_TYPES
+    )
+    parser.add_argument("--estimator", type=str, nargs="+", default=ESTIMATORS)
+    parser.add_argument(
+        "--history",
+        type=str,
+        nargs="+",
+        default=["none", "strided"],
+        help="History policies (none, strided, log or dense), recorded on disk",
+    )
+    parser.add_argument("--history_every", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=10000, help="Steps per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Trimming level")
+    parser.add_argument("--tau", type=float, default=5, help="Clipping threshold")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--output", type=str, default=os.path.join("results", "benchmarks", "run.json")
+    )
+    parser.add_argument("--baseline", type=str, help="JSON of a previous run")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Relative slowdown tolerated"
+    )
+    args = parser.parse_args()
+
+    results = []
+    for n in args.n:
+        # the data of a size does not depend on the other sizes run
+        rng = np.random.default_rng([args.seed, n])
+        data = rng.permutation(np.arange(1, n + 1)).astype(float)
+        for graph_type in args.graph:
+            graph = generate_graph(n, graph_type, args.seed)
+            for history in args.history:
+                for name in args.estimator:
+                    result = benchmark(
+                        name, graph, graph_type, data, args.steps, history, args
+                    )
+                    results.append(result)
+                    print(
+                        f"{case_key(result)}: "
+                        f"{result['steps_per_second']:.0f} steps/s, "
+                        f"{result['peak_memory_mb']:.2f} MB"
+                    )
+
+    report = {
+        "config": vars(args),
+        "machine": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
-import random
 import numpy as np
-from src.graph import generate_graph
+from src.graph import generate_graph, load_graph
 from scipy.stats import trim_mean
 from src.rank import (
     GoRankEstimate,
@@ -9,13 +8,586 @@ from src.rank import (
     GoRankEstimateAsync,
 )
 from src.trim import MeanEstimate, ClippedGossip
+from src.batch import (
+    BatchGoRankEstimate,
+    BatchImprovedBaselineEstimate,
+    BatchBaselineEstimate,
+    BatchGoRankEstimateAsync,
+    BatchMeanEstimate,
+    BatchClippedGossip,
+)
 import os
 import pickle
+from functools import partial
 from omegaconf import OmegaConf
 import yaml
 from src.utils import wn, compute_connectivity
+from src.cache import cached_graph, graph_spec, file_digest
+from src.history import snapshot_times, history_path
+from src.metrics import RankError, MeanError, TrimError
+from src.schedule import (
+    EdgeSchedule,
+    MatchingSchedule,
+    PoissonSchedule,
+    schedule_path,
+    clock_rates,
+    edge_rates,
+)
+from src.aggregate import RunningStats
+from src.stopping import EarlyStopping
+from src.store import save_results, store_path
+from src.profiling import Profile, start_profiler, stop_profiler, save_report
+from src.decimate import decimate, LOD_KEYS, LOD_POINTS
+from src.checkpoint import (
+    BlockCheckpoint,
+    block_path,
+    completed_blocks,
+    extension_seed,
+    load_pickle,
+    save_pickle,
+)
+from src.kernels import KERNELS, NUMBA, run_compiled
 import argparse
 import time
+from concurrent.futures import ProcessPoolExecutor
+
+BATCHED = {
+    GoRankEstimate: BatchGoRankEstimate,
+    ImprovedBaselineEstimate: BatchImprovedBaselineEstimate,
+    BaselineEstimate: BatchBaselineEstimate,
+    GoRankEstimateAsync: BatchGoRankEstimateAsync,
+}
+
+
+def make_metrics(task, estimates, true_ranks, true_value, times):
+    """Online error metrics of the estimates, evaluated at the times `times`."""
+    if task == "ranking":
+        return [RankError(estimate, true_ranks, times) for estimate in estimates]
+    elif task == "averaging":
+        return [
+            (
+                MeanError(estimate, true_value, times)
+                if "Clipped Gossip" in estimate.name
+                else TrimError(estimate, true_value, times)
+            )
+            for estimate in estimates
+        ]
+
+
+def final_error(task, estimate, true_ranks, n, alpha):
+    """Absolute error of each node at the end of a trial."""
+    if task == "ranking":
+        estimated_ranks = estimate.ranking * estimate.weight
+        return np.abs(estimated_ranks - (true_ranks / n))
+    elif task == "averaging":
+        if "Clipped Gossip" in estimate.name:
+            return np.zeros(true_ranks.shape)
+        true_weight = n * wn(n, true_ranks + 1, alpha)
+        return np.abs(estimate.w - true_weight)
+
+
+def histories(estimate):
+    """Histories recorded by an estimate."""
+    names = ["historical_ranking", "historical_z", "historical_w"]
+    return [getattr(estimate, name) for name in names if hasattr(estimate, name)]
+
+
+def run_kernels(setup, estimates, metrics, pairs):
+    """
+    With the compiled backend, run the whole schedule of the ranking estimates
+    that have a kernel, and return the (estimate, metric) pairs left to step.
+    """
+    stepped = list(zip(estimates, metrics))
+    if setup["task"] != "ranking" or setup["backend"] != "compiled":
+        return stepped
+    for estimate, metric in stepped:
+        if type(estimate) in KERNELS:
+            run_compiled(estimate, metric, pairs)
+    return [pair for pair in stepped if type(pair[0]) not in KERNELS]
+
+
+def trial_setup(setup, trial, seed_seq, first=1):
+    """
+    Data, true ranks and edge schedule of a trial, drawn from the trial's own
+    random stream so that trials can be run in any order or process.
+    When the horizon of a finished trial is extended, the schedule only
+    covers the steps from `first` on, drawn from the extension stream.
+    """
+    rng = np.random.default_rng(seed_seq)
+    data = setup["data"]
+    if setup["shuffle"] == "yes":
+        data = rng.permutation(data)
+    # ranks of the nodes, for each signal
+    true_ranks = np.argsort(np.argsort(data, axis=0), axis=0)
+    if first > 1:
+        rng = np.random.default_rng(extension_seed(seed_seq, first))
+        steps = setup["horizon"] - first
+        schedule = EdgeSchedule.sample(setup["graph"].edges, steps, rng)
+        if setup["schedule_folder"]:
+            name = f"{trial}_from_{first}"
+            schedule.save(schedule_path(setup["schedule_folder"], name))
+        return data, true_ranks, schedule
+    # all estimators of a trial consume the same schedule, of edges, of
+    # matchings in the matching engine or of Poisson clock events
+    steps = setup["horizon"] - 1
+    if setup["engine"] == "matching":
+        Schedule, ext = MatchingSchedule, "npz"
+    elif setup["clock"] != "uniform":
+        Schedule, ext = PoissonSchedule, "npz"
+    else:
+        Schedule, ext = EdgeSchedule, "npy"
+    if setup["replay"]:
+        schedule = Schedule.load(schedule_path(setup["replay"], trial, ext))
+    elif Schedule is MatchingSchedule:
+        schedule = MatchingSchedule.sample(setup["graph"], steps, rng)
+    elif Schedule is PoissonSchedule:
+        schedule = PoissonSchedule.sample(
+            setup["graph"].edges, setup["rates"], steps, rng
+        )
+    else:
+        schedule = EdgeSchedule.sample(setup["graph"].edges, steps, rng)
+    if setup["schedule_folder"]:
+        schedule.save(schedule_path(setup["schedule_folder"], trial, ext))
+    return data, true_ranks, schedule
+
+
+def fold_schedule(setup, aggregates, schedule):
+    """
+    Fold the quantities of a trial's schedule at the evaluation times: the
+    cumulative edge activations of matching rounds, or the continuous time
+    of Poisson clock events.
+    """
+    if isinstance(schedule, MatchingSchedule):
+        values = {"activations": schedule.activations(setup["times"])}
+    elif isinstance(schedule, PoissonSchedule):
+        values = {"clock": schedule.elapsed(setup["times"])}
+    else:
+        values = {}
+    for name, value in values.items():
+        if name not in aggregates:
+            aggregates[name] = RunningStats(len(setup["times"]))
+        aggregates[name].update(value)
+
+
+def make_rules(setup, estimates, metrics):
+    """Early stopping rules of the estimates, or None when stopping is off."""
+    if setup["stopping"] is None:
+        return None
+    return {
+        estimate.name: EarlyStopping(metric, **setup["stopping"])
+        for estimate, metric in zip(estimates, metrics)
+    }
+
+
+def extend_trial(setup, estimates, metrics):
+    """
+    Continue estimates and metrics saved at the end of a shorter horizon up
+    to the horizon and evaluation times of the setup.
+    """
+    for estimate, metric in zip(estimates, metrics):
+        estimate.horizon = setup["horizon"]
+        if hasattr(estimate, "rank"):
+            estimate.rank.horizon = setup["horizon"]
+        metric.extend(setup["times"])
+
+
+def check_rules(rules, stepped, t):
+    """(estimate, metric) pairs of `stepped` whose trials have not all stopped."""
+    return [pair for pair in stepped if not rules[pair[0].name].check(t)]
+
+
+def step_estimates(task, stepped, t, i, j, profile):
+    """
+    Update the (estimate, metric) pairs `stepped` with the edges (i, j) of
+    step t. With `profile.estimators`, the updates of each estimate and of
+    its metric are timed.
+    """
+    for estimate, metric in stepped:
+        if profile.estimators:
+            start = time.perf_counter()
+        if task == "ranking":
+            estimate.update(t, i, j)
+        elif task == "averaging":
+            if "Clipped Gossip" not in estimate.name:
+                estimate.rank.update(t, i, j)
+            estimate.update_mean(t, i, j)
+        if profile.estimators:
+            middle = time.perf_counter()
+        metric.update(t, i, j)
+        if profile.estimators:
+            end = time.perf_counter()
+            profile.add_update(estimate.name, middle - start, end - middle)
+
+
+def run_loop(setup, trials, seeds, checkpoint=None, profile=None):
+    """
+    Run the given trials of an experiment one after the other. With a
+    BlockCheckpoint, the in-flight state is saved periodically and restored,
+    and the trials of a shorter run can be extended. The phases of the
+    trials are timed in `profile`.
+    """
+    profile = profile or Profile()
+    task = setup["task"]
+    horizon, n = setup["horizon"], setup["n"]
+    alpha, tau = setup["alpha"], setup["tau"]
+    extrema, precision = setup["extrema"], setup["precision"]
+    no_history = snapshot_times(horizon, "none")
+
+    def make_estimates(data, trial):
+        # trajectories of the first trials can be recorded on disk
+        record = setup["history_folder"] and trial < setup["history_trials"]
+        times = setup["history_times"] if record else no_history
+
+        def path(name):
+            return (
+                history_path(setup["history_folder"], trial, name) if record else None
+            )
+
+        if task == "ranking":
+            return [
+                class_estimate(
+                    horizon, n, data, times, path(class_estimate.__name__), precision
+                )
+                for class_estimate in setup["class_estimates"]
+            ]
+        elif task == "averaging":
+            estimates = [
+                MeanEstimate(
+                    horizon,
+                    n,
+                    data,
+                    alpha,
+                    rank_class,
+                    times,
+                    path(f"MeanEstimate_{rank_class.__name__}"),
+                    precision,
+                )
+                for rank_class in setup["class_estimates"]
+            ]
+            clipped = ClippedGossip(
+                horizon, n, data, tau, times, path("ClippedGossip"), precision
+            )
+            return estimates + [clipped]
+
+    state = checkpoint.load() if checkpoint else None
+    previous = checkpoint.previous if checkpoint else None
+    # first step of the schedules, after the horizon of a previous run
+    first = previous["horizon"] if previous else 1
+    stats, final, stops, schedules = {}, {}, {}, {}
+    if state is not None:
+        stats, final, stops, schedules = state["aggregates"]
+        checkpoint.states = state["states"]
+    for k, (trial, seed_seq) in enumerate(zip(trials, seeds)):
+        if state is not None and k < state["trial"]:
+            continue
+        if trial % 10 == 0:
+            print(f"Trial {trial}/{setup['n_trials']}")
+        data, true_ranks, schedule = profile.timed("schedule", trial_setup)(
+            setup, trial, seed_seq, first
+        )
+        start = first
+        if state is not None and state["objects"] is not None:
+            estimates, metrics, stepped, rules, start = state["objects"]
+        elif previous:
+            estimates, metrics = previous["states"][k]
+            extend_trial(setup, estimates, metrics)
+            stepped, rules = list(zip(estimates, metrics)), None
+        else:
+            fold_schedule(setup, schedules, schedule)
+            profile.begin("estimates")
+            estimates = make_estimates(data, trial)
+            metrics = make_metrics(
+                task, estimates, true_ranks, setup["true_value"], setup["times"]
+            )
+            profile.end("estimates")
+            stepped = profile.timed("kernels", run_kernels)(
+                setup, estimates, metrics, schedule.pairs
+            )
+            rules = make_rules(setup, estimates, metrics)
+        state = None
+        pairs = schedule.pairs[start - first :].tolist()
+        profile.begin("updates")
+        for t, (i, j) in enumerate(pairs, start=start):
+            step_estimates(task, stepped, t, i, j, profile)
+            profile.progress(1)
+            # stopped estimates are no longer updated
+            if rules and t % setup["stopping"]["every"] == 0:
+                stepped = check_rules(rules, stepped, t)
+                if not stepped:
+                    break
+            if checkpoint and checkpoint.due():
+                profile.timed("checkpoint", checkpoint.save)(
+                    {
+                        "trial": k,
+                        "aggregates": (stats, final, stops, schedules),
+                        "states": checkpoint.states,
+                        "objects": (estimates, metrics, stepped, rules, t + 1),
+                    }
+                )
+        profile.end("updates")
+        # final errors and aggregation of the curves of the trial
+        profile.begin("reconstruction")
+        for estimate, metric in zip(estimates, metrics):
+            for history in histories(estimate):
+                history.flush()
+            if estimate.name not in stats:
+                stats[estimate.name] = RunningStats(len(setup["times"]), extrema)
+                final[estimate.name] = RunningStats(setup["data"].shape)
+                stops[estimate.name] = RunningStats(())
+            if rules:
+                rules[estimate.name].finish(horizon)
+                stops[estimate.name].update(rules[estimate.name].stop)
+            stats[estimate.name].update(metric.curve.values)
+            final[estimate.name].update(
+                final_error(task, estimate, true_ranks, n, alpha)
+            )
+        profile.end("reconstruction")
+        if checkpoint:
+            if checkpoint.keep:
+                checkpoint.states.append((estimates, metrics))
+            if checkpoint.due():
+                profile.timed("checkpoint", checkpoint.save)(
+                    {
+                        "trial": k + 1,
+                        "aggregates": (stats, final, stops, schedules),
+                        "states": checkpoint.states,
+                        "objects": None,
+                    }
+                )
+    return stats, final, stops, schedules, data, true_ranks
+
+
+def run_batched(setup, trials, seeds, checkpoint=None, profile=None):
+    """
+    Run the given trials of an experiment as one vectorized simulation.
+    Each trial uses its own random stream, as in the per-trial loop, so both
+    engines give the same error curves for a fixed seed. Checkpoints and
+    profiles work as in the per-trial loop.
+    """
+    profile = profile or Profile()
+    task = setup["task"]
+    horizon, n = setup["horizon"], setup["n"]
+    alpha, tau = setup["alpha"], setup["tau"]
+    precision = setup["precision"]
+    if setup["history_folder"]:
+        raise ValueError("Histories are only recorded by the loop engine.")
+    previous = checkpoint.previous if checkpoint else None
+    first = previous["horizon"] if previous else 1
+    draws = [
+        profile.timed("schedule", trial_setup)(setup, *args, first)
+        for args in zip(trials, seeds)
+    ]
+    datas = np.stack([data for data, _, _ in draws])
+    true_ranks = np.stack([ranks for _, ranks, _ in draws])
+    pairs = np.stack([schedule.pairs for _, _, schedule in draws])
+    true_values = np.broadcast_to(setup["true_value"], datas.shape)
+    state = checkpoint.load() if checkpoint else None
+    start = first
+    if state is not None:
+        estimates, metrics, stepped, rules, stopped_errors, start = state["objects"]
+    elif previous:
+        estimates, metrics = previous["states"]
+        extend_trial(setup, estimates, metrics)
+        stepped, rules, stopped_errors = list(zip(estimates, metrics)), None, {}
+    else:
+        profile.begin("estimates")
+        if task == "ranking":
+            estimates = [
+                BATCHED[class_estimate](horizon, n, datas, precision)
+                for class_estimate in setup["class_estimates"]
+            ]
+        elif task == "averaging":
+            estimates = [
+                BatchMeanEstimate(
+                    horizon, n, datas, alpha, BATCHED[rank_class], precision
+                )
+                for rank_class in setup["class_estimates"]
+            ]
+            estimates += [BatchClippedGossip(horizon, n, datas, tau, precision)]
+        metrics = make_metrics(task, estimates, true_ranks, true_values, setup["times"])
+        profile.end("estimates")
+        stepped = profile.timed("kernels", run_kernels)(
+            setup, estimates, metrics, pairs
+        )
+        rules = make_rules(setup, estimates, metrics)
+        # final errors of the trials at their stop time
+        stopped_errors = {
+            estimate.name: np.zeros(datas.shape) for estimate in estimates if rules
+        }
+    profile.begin("updates")
+    for t in range(start, horizon):
+        if t % max(horizon // 10, 1) == 0:
+            print(f"Step {t}/{horizon}")
+        i, j = pairs[:, t - first, 0, None], pairs[:, t - first, 1, None]
+        step_estimates(task, stepped, t, i, j, profile)
+        profile.progress(len(trials))
+        # stopped trials keep being updated until all trials of an estimate
+        # have stopped, but their curves and final errors are frozen
+        if rules and t % setup["stopping"]["every"] == 0:
+            running = check_rules(rules, stepped, t)
+            for estimate, _ in stepped:
+                newly = rules[estimate.name].newly
+                if newly.any():
+                    absolute_error = final_error(task, estimate, true_ranks, n, alpha)
+                    stopped_errors[estimate.name][newly] = absolute_error[newly]
+            stepped = running
+            if not stepped:
+                break
+        if checkpoint and checkpoint.due():
+            objects = (estimates, metrics, stepped, rules, stopped_errors, t + 1)
+            profile.timed("checkpoint", checkpoint.save)({"objects": objects})
+    profile.end("updates")
+
+    # fold the trials in order, as the per-trial loop does
+    profile.begin("reconstruction")
+    stats, final, stops, schedules = {}, {}, {}, {}
+    for _, _, schedule in draws:
+        fold_schedule(setup, schedules, schedule)
+    for estimate, metric in zip(estimates, metrics):
+        stats[estimate.name] = RunningStats(len(setup["times"]), setup["extrema"])
+        final[estimate.name] = RunningStats(setup["data"].shape)
+        stops[estimate.name] = RunningStats(())
+        absolute_error = final_error(task, estimate, true_ranks, n, alpha)
+        if rules:
+            rule = rules[estimate.name]
+            stopped = (rule.stop >= 0).reshape((-1,) + (1,) * (datas.ndim - 1))
+            absolute_error = np.where(
+                stopped, stopped_errors[estimate.name], absolute_error
+            )
+            rule.finish(horizon)
+        for trial in range(len(trials)):
+            stats[estimate.name].update(metric.curve.values[:, trial])
+            final[estimate.name].update(absolute_error[trial])
+            if rules:
+                stops[estimate.name].update(rule.stop[trial])
+    profile.end("reconstruction")
+    if checkpoint and checkpoint.keep:
+        checkpoint.states = (estimates, metrics)
+    return stats, final, stops, schedules, datas[-1], true_ranks[-1]
+
+
+def run_matching(setup, trials, seeds, checkpoint=None, profile=None):
+    """
+    Run the given trials of an experiment in synchronous rounds: at round t,
+    all edges of a random maximal matching of the graph are activated at
+    once. The matched edges are disjoint, so a round is a single vectorized
+    update of the batched estimators, run on a batch of one trial. Along
+    with the errors per round, the cumulative number of edge activations at
+    the evaluation times is aggregated, to compare with the other engines
+    per activation. Only whole blocks are checkpointed.
+    """
+    profile = profile or Profile()
+    task = setup["task"]
+    horizon, n = setup["horizon"], setup["n"]
+    alpha, tau = setup["alpha"], setup["tau"]
+    precision = setup["precision"]
+    if setup["history_folder"]:
+        raise ValueError("Histories are only recorded by the loop engine.")
+    stats, final, stops, schedules = {}, {}, {}, {}
+    for trial, seed_seq in zip(trials, seeds):
+        if trial % 10 == 0:
+            print(f"Trial {trial}/{setup['n_trials']}")
+        data, true_ranks, schedule = profile.timed("schedule", trial_setup)(
+            setup, trial, seed_seq
+        )
+        fold_schedule(setup, schedules, schedule)
+        datas, ranks = data[None], true_ranks[None]
+        true_values = np.broadcast_to(setup["true_value"], datas.shape)
+        profile.begin("estimates")
+        if task == "ranking":
+            estimates = [
+                BATCHED[class_estimate](horizon, n, datas, precision)
+                for class_estimate in setup["class_estimates"]
+            ]
+        elif task == "averaging":
+            estimates = [
+                BatchMeanEstimate(
+                    horizon, n, datas, alpha, BATCHED[rank_class], precision
+                )
+                for rank_class in setup["class_estimates"]
+            ]
+            estimates += [BatchClippedGossip(horizon, n, datas, tau, precision)]
+        metrics = make_metrics(task, estimates, ranks, true_values, setup["times"])
+        profile.end("estimates")
+        stepped = list(zip(estimates, metrics))
+        rules = make_rules(setup, estimates, metrics)
+        profile.begin("updates")
+        for t in range(1, horizon):
+            i, j = schedule.matching(t)
+            i, j = i[None], j[None]
+            step_estimates(task, stepped, t, i, j, profile)
+            profile.progress(1)
+            # stopped estimates are no longer updated
+            if rules and t % setup["stopping"]["every"] == 0:
+                stepped = check_rules(rules, stepped, t)
+                if not stepped:
+                    break
+        profile.end("updates")
+        profile.begin("reconstruction")
+        for estimate, metric in zip(estimates, metrics):
+            if estimate.name not in stats:
+                stats[estimate.name] = RunningStats(
+                    len(setup["times"]), setup["extrema"]
+                )
+                final[estimate.name] = RunningStats(setup["data"].shape)
+                stops[estimate.name] = RunningStats(())
+            if rules:
+                rules[estimate.name].finish(horizon)
+                stops[estimate.name].update(rules[estimate.name].stop[0])
+            stats[estimate.name].update(metric.curve.values[:, 0])
+            final[estimate.name].update(final_error(task, estimate, ranks, n, alpha)[0])
+        profile.end("reconstruction")
+    return stats, final, stops, schedules, data, true_ranks
+
+
+def checkpoint_key(config):
+    """Config of an experiment, without the settings a resumed run may change."""
+    config = OmegaConf.to_container(config, resolve=True)
+    for name in ["n_trials", "horizon", "block_size"]:
+        config["experiment"].pop(name, None)
+    config.pop("checkpoint", None)
+    return config
+
+
+def run_block(setup, trials, seeds):
+    """
+    Run a block of trials and return the partial aggregates of its errors.
+    With checkpoints, the aggregates of a finished block are saved and
+    reused, and those of a block finished with a shorter horizon are
+    recomputed by extending its trials from their saved final states.
+    The Profile of the block is returned along with its aggregates.
+    """
+    profile = Profile(**setup["profile"])
+    engines = {"loop": run_loop, "batched": run_batched, "matching": run_matching}
+    run = engines[setup["engine"]]
+    if setup["checkpoint"] is None:
+        return run(setup, trials, seeds, profile=profile), profile
+    folder = setup["checkpoint"]["folder"]
+    path = block_path(folder, trials)
+    saved = load_pickle(path) if os.path.exists(path) else None
+    if saved is not None and saved["horizon"] == setup["horizon"]:
+        return saved["output"], profile
+    if saved is not None and saved["states"] is None:
+        raise ValueError(
+            "Extending a horizon needs trial states (checkpoint.states: true)."
+        )
+    if os.path.exists(block_path(folder, trials, "_state")):
+        print(f"Resuming trials {trials[0]}-{trials[-1]} from their last checkpoint")
+    checkpoint = BlockCheckpoint(
+        block_path(folder, trials, "_state"),
+        setup["checkpoint"]["every"],
+        setup["horizon"],
+        saved,
+        setup["checkpoint"]["states"],
+    )
+    output = run(setup, trials, seeds, checkpoint, profile)
+    states = checkpoint.states if checkpoint.keep else None
+    with profile.phase("checkpoint"):
+        save_pickle(
+            {"horizon": setup["horizon"], "output": output, "states": states}, path
+        )
+    checkpoint.clear()
+    return output, profile
 
 
 def main():
@@ -23,6 +595,12 @@ def main():
     parser.add_argument(
         "--exp_name", type=str, default="", help="Name of the experiment"
     )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continue from the last checkpoint"
+    )
     args = parser.parse_args()
     exp_name = args.exp_name
 
@@ -31,46 +609,98 @@ def main():
     config = OmegaConf.load(config_path)
     exp_name = config.path.folder
     print(f"Running experiment: {exp_name}")
+    seed = config.experiment.seed
+    rng = np.random.default_rng(seed)
     n = config.data.n
+    # several signals per node are ranked and averaged at once
+    signals = OmegaConf.select(config, "data.signals") or 1
     if config.data.type == "arange":
         data = np.arange(1, n + 1)
+        if signals > 1:
+            # the other signals are random permutations of the first one
+            others = [rng.permutation(n) + 1 for _ in range(signals - 1)]
+            data = np.stack([data] + others, axis=1)
         eps = OmegaConf.select(config, "data.eps") or 0
         n_outliers = int(eps * n)
         if n_outliers > 0:
             # scale contamination
             outlier = OmegaConf.select(config, "data.outlier") or 10
-            indices = np.random.choice(n, n_outliers, replace=False)
+            indices = rng.choice(n, n_outliers, replace=False)
             data[indices] = outlier * data[indices]
         graph_init = False
     elif config.data.type == "real":
         treshold = OmegaConf.select(config, "data.treshold") or 0
         file = f"data/graph_{treshold}.pkl"
-        with open(file, "rb") as f:
-            graph = pickle.load(f)
-            print(f"Connectivity: {compute_connectivity(graph):.2e}")
-            graph_init = True
-        data = np.array([graph.nodes[i]["temperature"] for i in graph.nodes()])
+        attributes = OmegaConf.select(config, "data.attributes")
+        if attributes is not None:
+            attributes = list(attributes)
+        graph, data = load_graph(file, attributes or "temperature")
+        graph_init = True
+        spec = {"type": "real", "file": file, "digest": file_digest(file)}
+
+        def build_graph():
+            return graph
+
         eps = OmegaConf.select(config, "data.eps") or 0
         n = len(data)
         print("Dataset size", n)
         n_outliers = int(eps * n)
-        print("Normal data", np.mean(data))
+        print("Normal data", np.mean(data, axis=0))
         if n_outliers > 0:
             # randomly select n_outliers indices to corrupt
-            indices = np.random.choice(n, n_outliers, replace=False)
+            indices = rng.choice(n, n_outliers, replace=False)
             outlier = OmegaConf.select(config, "data.outlier") or 100
             data[indices] = data[indices] + outlier  # shift contamination
         # add small noise to make sure data is disctinct
-        data = np.array([v + random.uniform(-1e-4, 1e-4) for v in data])
+        data = data + rng.uniform(-1e-4, 1e-4, size=data.shape)
     else:
         print("Wrong data type.")
     n_trials = config.experiment.n_trials
     horizon = config.experiment.horizon
     graph_type = config.graph
+    generator_params = OmegaConf.select(config, "graph_params")
+    if generator_params is not None:
+        generator_params = OmegaConf.to_container(generator_params)
     alpha = OmegaConf.select(config, "trimming.alpha") or 0
     task = OmegaConf.select(config, "task") or "ranking"
     shuffle = OmegaConf.select(config, "data.shuffle") or "yes"
-    seed = config.experiment.seed
+    engine = OmegaConf.select(config, "experiment.engine") or "loop"
+    backend = OmegaConf.select(config, "experiment.backend") or "python"
+    precision = OmegaConf.select(config, "experiment.precision") or "double"
+    if backend == "compiled" and not NUMBA:
+        # the kernels are much slower than the estimators without numba
+        print("Numba is not installed, running the python backend instead.")
+        backend = "python"
+    evaluation = OmegaConf.select(config, "evaluation.policy") or "dense"
+    every = OmegaConf.select(config, "evaluation.every") or 1
+    num = OmegaConf.select(config, "evaluation.num") or 100
+    times = snapshot_times(horizon, evaluation, every, num)
+    save_schedules = OmegaConf.select(config, "experiment.save_schedules") or False
+    replay = OmegaConf.select(config, "experiment.replay")
+    block_size = OmegaConf.select(config, "experiment.block_size") or 100
+    extrema = OmegaConf.select(config, "aggregation.extrema") or False
+    graph_cache = OmegaConf.select(config, "experiment.graph_cache", default=True)
+    history_policy = OmegaConf.select(config, "history.policy") or "none"
+    history_every = OmegaConf.select(config, "history.every") or 1
+    history_num = OmegaConf.select(config, "history.num") or 100
+    history_trials = OmegaConf.select(config, "history.trials") or 1
+    history_times = snapshot_times(horizon, history_policy, history_every, history_num)
+    clock = OmegaConf.select(config, "clock.type") or "uniform"
+    slow_fraction = OmegaConf.select(config, "clock.slow_fraction") or 0
+    slow_rate = OmegaConf.select(config, "clock.slow_rate") or 1
+    if clock != "uniform" and engine == "matching":
+        raise ValueError("Poisson clocks are not supported by the matching engine.")
+    stopping = None
+    if OmegaConf.select(config, "stopping") is not None:
+        stopping = OmegaConf.to_container(config.stopping)
+        stopping.setdefault("every", 1000)
+        if backend == "compiled":
+            raise ValueError("Early stopping is not supported by compiled kernels.")
+    use_checkpoint = args.resume or OmegaConf.select(config, "checkpoint") is not None
+    checkpoint_every = OmegaConf.select(config, "checkpoint.every") or 600
+    checkpoint_states = OmegaConf.select(config, "checkpoint.states") or False
+    if use_checkpoint and history_policy != "none":
+        raise ValueError("Histories are not recorded with checkpoints.")
     if config.ranking == "GoRank":
         class_estimates = [GoRankEstimate]
     elif config.ranking == "All":
@@ -81,121 +711,267 @@ def main():
             GoRankEstimate,
             GoRankEstimateAsync,
         ]
+    # instrumentation of the run, reported in run_report.json
+    profile_config = {
+        "memory": OmegaConf.select(config, "profile.memory") or False,
+        "estimators": OmegaConf.select(config, "profile.estimators") or False,
+        "every": OmegaConf.select(config, "profile.every") or 60,
+    }
+    profiler_kind = OmegaConf.select(config, "profile.profiler")
     ### END CONDIG ###
 
     ### INIT ###
-    np.random.seed(seed)
-    np.random.shuffle(data)
-    true_ranks = np.argsort(np.argsort(data))
+    profile = Profile(**profile_config)
+    profiler = start_profiler(profiler_kind)
+    rng.shuffle(data)
     trimmed_mean = trim_mean(data, alpha)
-    print("Corrupted mean", np.mean(data))
+    print("Corrupted mean", np.mean(data, axis=0))
     print("Robust mean", trimmed_mean)
-    true_value = np.full(n, trimmed_mean)
+    true_value = np.full(data.shape, trimmed_mean)
     if not graph_init:
-        graph = generate_graph(n=n, type=graph_type, seed=seed)
-        print(f"Connectivity: {compute_connectivity(graph):.2e}")
-    edges = list(graph.edges)
-    if task == "ranking":
-        estimates = [
-            class_estimate(horizon, n, data) for class_estimate in class_estimates
-        ]
-    elif task == "averaging":
+        spec = graph_spec(n, graph_type, seed, generator_params)
+        build_graph = partial(
+            generate_graph, n=n, type=graph_type, seed=seed, params=generator_params
+        )
+    # edges and connectivity are cached on disk, keyed by the graph spec
+    build = profile.timed("graph_generation", build_graph)
+    connect = profile.timed("connectivity", compute_connectivity)
+    with profile.phase("graph"):
+        if graph_cache:
+            graph, connectivity = cached_graph(spec, build, connect=connect)
+        else:
+            graph = build()
+            connectivity = connect(graph)
+    print(f"Connectivity: {connectivity:.2e}")
+    # rates of the exponential clocks of the edges, or of the nodes
+    rates = None
+    if clock == "node":
+        node_rates = clock_rates(n, slow_fraction, slow_rate, rng)
+        rates = edge_rates(graph, node_rates)
+    elif clock == "edge":
+        rates = clock_rates(graph.number_of_edges(), slow_fraction, slow_rate, rng)
+    elif clock != "uniform":
+        raise ValueError("Wrong clock type.")
+    schedule_folder = os.path.join("results", "outputs", exp_name, "schedules")
+    if save_schedules:
+        os.makedirs(schedule_folder, exist_ok=True)
+    history_folder = os.path.join("results", "outputs", exp_name, "history")
+    if history_policy != "none":
+        os.makedirs(history_folder, exist_ok=True)
+        np.save(os.path.join(history_folder, "times.npy"), history_times)
+    # completed blocks are reused and extended from their checkpoints
+    checkpoint_folder = os.path.join("results", "outputs", exp_name, "checkpoints")
+    manifest_path = os.path.join(checkpoint_folder, "manifest.pkl")
+    completed = []
+    if use_checkpoint and args.resume and os.path.exists(manifest_path):
+        manifest = load_pickle(manifest_path)
+        if manifest["key"] != checkpoint_key(config):
+            raise ValueError("The config has changed since the last checkpoint.")
+        if horizon < manifest["horizon"]:
+            raise ValueError("The horizon of a checkpointed run cannot be reduced.")
+        if horizon > manifest["horizon"]:
+            if engine == "matching" or clock != "uniform" or stopping or replay:
+                raise ValueError(
+                    "Only uniform edge schedules without early stopping can be "
+                    "extended."
+                )
+            print(f"Extending the horizon from {manifest['horizon']} to {horizon}")
+            # evaluation times of the previous run, then those of the new horizon
+            later = times[times > manifest["horizon"] - 1]
+            times = np.concatenate([manifest["times"], later])
+        else:
+            times = manifest["times"]
+        completed = completed_blocks(checkpoint_folder)
+        if completed and completed[-1][1] > n_trials:
+            raise ValueError(
+                "The number of trials of a checkpointed run cannot be reduced."
+            )
+        print(f"Resuming after {len(completed)} completed blocks")
+    elif use_checkpoint:
+        os.makedirs(checkpoint_folder, exist_ok=True)
+        for name in os.listdir(checkpoint_folder):
+            if name.startswith("block_"):
+                os.remove(os.path.join(checkpoint_folder, name))
+    if use_checkpoint:
+        save_pickle(
+            {"key": checkpoint_key(config), "horizon": horizon, "times": times},
+            manifest_path,
+        )
+    tau = OmegaConf.select(config, "clipping.tau") or 100
+    if task == "averaging":
         class_estimates = [GoRankEstimate, ImprovedBaselineEstimate]
-        estimates = [
-            MeanEstimate(horizon, n, data, alpha, rank_class)
-            for rank_class in class_estimates
+    if data.ndim > 1:
+        # only GoRank keeps a state per signal, and the kernels are scalar
+        skipped = [
+            cls.__name__
+            for cls in class_estimates
+            if cls not in (GoRankEstimate, GoRankEstimateAsync)
         ]
-        tau = OmegaConf.select(config, "clipping.tau") or 100
-        estimates += [ClippedGossip(horizon, n, data, tau)]
-    error_mean = {estimate.name: np.zeros(n) for estimate in estimates}
-    all_relative_errors = {estimate.name: [] for estimate in estimates}
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: a single signal per node only")
+        class_estimates = [
+            cls
+            for cls in class_estimates
+            if cls in (GoRankEstimate, GoRankEstimateAsync)
+        ]
+        if backend == "compiled":
+            raise ValueError("Compiled kernels support a single signal per node.")
+
+    setup = {
+        "task": task,
+        "engine": engine,
+        "backend": backend,
+        "precision": precision,
+        "class_estimates": class_estimates,
+        "horizon": horizon,
+        "n": n,
+        "n_trials": n_trials,
+        "data": data,
+        "graph": graph,
+        "shuffle": shuffle,
+        "alpha": alpha,
+        "tau": tau,
+        "true_value": true_value,
+        "times": times,
+        "replay": replay,
+        "clock": clock,
+        "stopping": stopping,
+        "rates": rates,
+        "schedule_folder": schedule_folder if save_schedules else None,
+        "extrema": extrema,
+        "history_times": history_times,
+        "history_folder": history_folder if history_policy != "none" else None,
+        "history_trials": history_trials,
+        "profile": profile_config,
+        "checkpoint": (
+            {
+                "folder": checkpoint_folder,
+                "every": checkpoint_every,
+                "states": checkpoint_states,
+            }
+            if use_checkpoint
+            else None
+        ),
+    }
+    # one independent random stream per trial
+    seeds = np.random.SeedSequence(seed).spawn(n_trials)
     ### END INIT ###
 
     ### SCRIPT ###
-    for trial in range(n_trials):
-        if shuffle == "yes":
-            np.random.shuffle(data)
-            true_ranks = np.argsort(np.argsort(data))
-        if trial % 10 == 0:
-            print(f"Trial {trial}/{n_trials}")
-        if task == "ranking":
-            estimates = [
-                class_estimate(horizon, n, data) for class_estimate in class_estimates
-            ]
-        elif task == "averaging":
-            estimates = [
-                MeanEstimate(horizon, n, data, alpha, rank_class)
-                for rank_class in class_estimates
-            ]
-            estimates += [ClippedGossip(horizon, n, data, tau)]
-        t = 1
-        while t < horizon:
-            i, j = random.choice(edges)
-            for estimate in estimates:
-                if task == "ranking":
-                    estimate.update(t, i, j)
-
-                elif task == "averaging":
-                    if "Clipped Gossip" not in estimate.name:
-                        estimate.rank.update(t, i, j)
-                    estimate.update_mean(t, i, j)
-            t += 1
-        relative_error = {estimate.name: np.zeros(horizon) for estimate in estimates}
-        for estimate in estimates:
-            if task == "ranking":
-                estimated_ranks = estimate.historical_ranking[-1] * estimate.weight
-                absolute_error = np.abs(estimated_ranks - (true_ranks / n))
-                error_mean[estimate.name] += absolute_error
-                for t in range(horizon):
-                    estimated_ranks = estimate.historical_ranking[t] * estimate.weight
-                    relative_error[estimate.name][t] = np.average(
-                        np.abs(estimated_ranks - (true_ranks / n))
-                    )
-                all_relative_errors[estimate.name].append(relative_error[estimate.name])
-            elif task == "averaging":
-                true_weight = n * wn(n, true_ranks + 1, alpha)
-                if "Clipped Gossip" not in estimate.name:
-                    absolute_error = np.abs(estimate.historical_w[-1] - true_weight)
-                    error_mean[estimate.name] += absolute_error
-                for t in range(horizon):
-                    relative_error[estimate.name][t] = np.average(
-                        np.abs(estimate.historical_z[t] - true_value)
-                    )
-                all_relative_errors[estimate.name].append(relative_error[estimate.name])
-
-    for estimate in estimates:
-        error_mean[estimate.name] /= n_trials
-        mean_relative_error = {
-            estimate.name: np.mean(all_relative_errors[estimate.name], axis=0)
-            for estimate in estimates
-        }
-        std_relative_error = {
-            estimate.name: np.std(all_relative_errors[estimate.name], axis=0)
-            for estimate in estimates
-        }
-    names = [estimate.name for estimate in estimates]
+    # trials are split in blocks of fixed size, whose partial aggregates are
+    # merged in trial order, so results do not depend on the worker count;
+    # blocks completed by a previous run keep their trials
+    covered = completed[-1][1] if completed else 0
+    blocks = [np.arange(start, stop) for start, stop in completed]
+    blocks += [
+        np.arange(start, min(start + block_size, n_trials))
+        for start in range(covered, n_trials, block_size)
+    ]
+    block_seeds = [[seeds[trial] for trial in block] for block in blocks]
+    workers = min(args.workers, len(blocks))
+    relative_error, final_error_stats, stop_stats = {}, {}, {}
+    schedule_stats = {}
+
+    def merge(outputs):
+        for output, block_profile in outputs:
+            profile.merge(block_profile)
+            stats, final, stops, schedules, data, true_ranks = output
+            for name in schedules:
+                if name not in schedule_stats:
+                    schedule_stats[name] = RunningStats(len(times))
+                schedule_stats[name].merge(schedules[name])
+            for name in stats:
+                if name not in relative_error:
+                    relative_error[name] = RunningStats(len(times), extrema)
+                    final_error_stats[name] = RunningStats(setup["data"].shape)
+                    stop_stats[name] = RunningStats(())
+                relative_error[name].merge(stats[name])
+                final_error_stats[name].merge(final[name])
+                stop_stats[name].merge(stops[name])
+        return data, true_ranks
+
+    args_blocks = [setup] * len(blocks), blocks, block_seeds
+    profile.begin("trials")
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            data, true_ranks = merge(pool.map(run_block, *args_blocks))
+    else:
+        data, true_ranks = merge(map(run_block, *args_blocks))
+    profile.end("trials")
+    names = list(relative_error.keys())
+    error_mean = {name: final_error_stats[name].mean for name in names}
+    mean_relative_error = {name: relative_error[name].mean for name in names}
+    std_relative_error = {name: relative_error[name].std for name in names}
     ### SCRIPT ###
 
     ### SAVE ###
     results = {
         "names": names,
         "config": config,
+        "timesteps": times,
         "data": data,
         "true_ranks": true_ranks,
         "error_mean": error_mean,
         "mean_relative_error": mean_relative_error,
         "std_relative_error": std_relative_error,
     }
+    # mean edge activations (matching rounds) or continuous time (Poisson
+    # clocks) at the timesteps
+    for name in schedule_stats:
+        results[name] = schedule_stats[name].mean
+    if stopping is not None:
+        # time-to-accuracy: mean and std of the stop times of the trials
+        results["stop_time"] = {name: float(stop_stats[name].mean) for name in names}
+        results["std_stop_time"] = {name: float(stop_stats[name].std) for name in names}
+    if extrema:
+        results["min_relative_error"] = {
+            name: relative_error[name].min for name in names
+        }
+        results["max_relative_error"] = {
+            name: relative_error[name].max for name in names
+        }
+    # level-of-detail curves drawn by the plots, decimated once here
+    profile.begin("decimation")
+    points = OmegaConf.select(config, "plot.points") or LOD_POINTS
+    lod = {
+        name: decimate(
+            times, mean_relative_error[name], std_relative_error[name], points
+        )
+        for name in names
+    }
+    for k, key in enumerate(LOD_KEYS):
+        results[key] = {name: lod[name][k] for name in names}
+    profile.end("decimation")
     folder_name = config.path.folder
     path = os.path.join("results", "outputs", folder_name)
     os.makedirs(path, exist_ok=True)
     config_path = os.path.join(path, "config.yaml")
+    # results are saved to a compressed store next to the configured pickle
+    # path (results.pkl -> results.npz), or pickled with `path.format: pickle`
     results_path = os.path.join(path, config.path.output)
-    with open(results_path, "wb") as f:
-        pickle.dump(results, f)
+    profile.begin("save")
+    if OmegaConf.select(config, "path.format") == "pickle":
+        with open(results_path, "wb") as f:
+            pickle.dump(results, f)
+    else:
+        save_results(store_path(results_path), results)
     config_dict = OmegaConf.to_container(config, resolve=True)
     with open(config_path, "w") as f:
         yaml.dump(config_dict, f, sort_keys=False)
+    profile.end("save")
+    # time per phase (summed over the blocks of the trials) and per estimator
+    report = {
+        "experiment": exp_name,
+        "engine": engine,
+        "workers": workers,
+        "n": n,
+        "n_trials": n_trials,
+        "horizon": horizon,
+        **profile.report(),
+    }
+    report["steps_per_second"] = report["steps"] / profile.phases["trials"]["seconds"]
+    save_report(report, os.path.join(path, "run_report.json"))
+    stop_profiler(profiler, path)
     ### END SAVE ###
 
 
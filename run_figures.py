@@ -3,139 +3,210 @@ from plot.plot_rank_b import main as plot_rank_b
 from plot.plot_rank_c import main as plot_rank_c
 from plot.plot_trim import main as plot_trim
 from plot.plot_trim_a import main as plot_trim_a
+from src.cache import file_digest
+from src.store import store_path
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+import matplotlib.pyplot as plt
 import argparse
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
 import os
 
+# figures of each plot name, as (plot function, experiments, file name)
+FIGURES = {
+    "rank_a": [(plot_rank_a, "exp2", "plot_rank_a.pdf")],  # watts-strogatz
+    "rank_a_appendix": [  # for all graphs
+        (plot_rank_a, "exp1", "plot_rank_a_complete.pdf"),
+        (plot_rank_a, "exp2", "plot_rank_a_ws.pdf"),
+        (plot_rank_a, "exp3", "plot_rank_a_grid.pdf"),
+    ],
+    # ["exp33", "exp31", "exp32"]
+    "rank_b": [(plot_rank_b, ["exp6", "exp5", "exp4"], "plot_rank_b.pdf")],
+    "rank_c": [(plot_rank_c, "exp8", "plot_rank_c.pdf")],  # watts-strogatz
+    "rank_c_appendix": [
+        (plot_rank_c, "exp7", "plot_rank_c_ws.pdf"),
+        (plot_rank_c, "exp8", "plot_rank_c_grid.pdf"),
+        (plot_rank_c, "exp9", "plot_rank_c_complete.pdf"),
+    ],
+    "trim_a": [(plot_trim_a, "exp10", "plot_trim_a.pdf")],
+    "trim_a_appendix": [
+        (plot_trim_a, "exp10", "plot_trim_a_ws.pdf"),
+        (plot_trim_a, "exp10a", "plot_trim_a_grid.pdf"),
+        (plot_trim_a, "exp10b", "plot_trim_a_complete.pdf"),
+    ],
+    "trim_b": [(plot_trim, "exp12", "plot_trim_b.pdf")],
+    "trim_b_appendix": [
+        (plot_trim, "exp11", "plot_trim_b_complete.pdf"),
+        (plot_trim, "exp12", "plot_trim_b_grid.pdf"),
+        (plot_trim, "exp13", "plot_trim_b_ws.pdf"),
+    ],
+    "trim_c": [(plot_trim, "exp14", "plot_trim_c.pdf")],
+    "rank_d_appendix": [
+        (plot_rank_c, "exp15", "plot_rank_d_ws.pdf"),
+        (plot_rank_c, "exp16", "plot_rank_d_complete.pdf"),
+        (plot_rank_c, "exp17", "plot_rank_d_grid.pdf"),
+    ],
+    "large_rank_c": [
+        (plot_rank_c, "exp18", "plot_large_rank_c_ws.pdf"),
+        (plot_rank_c, "exp19", "plot_large_rank_c_grid.pdf"),
+        (plot_rank_c, "exp20", "plot_large_rank_c_complete.pdf"),
+    ],
+    "xl_rank_c": [
+        (plot_rank_c, "exp21", "plot_xl_rank_c_ws.pdf"),
+        (plot_rank_c, "exp22", "plot_xl_rank_c_grid.pdf"),
+        (plot_rank_c, "exp23", "plot_xl_rank_c_complete.pdf"),
+    ],
+    "large_trim_c": [
+        (plot_trim, "exp24", "plot_large_trim_c_ws.pdf"),
+        (plot_trim, "exp25", "plot_large_trim_c_grid.pdf"),
+    ],
+    "xl_trim_c": [
+        (plot_trim, "exp26", "plot_xl_trim_c_ws.pdf"),
+        (plot_trim, "exp27", "plot_xl_trim_c_grid.pdf"),
+    ],
+    "xxl_rank_c": [(plot_rank_c, "exp28", "plot_xxl_rank_c.pdf")],
+    "xxl_trim_c": [(plot_trim, "exp28b", "plot_xxl_trim_c.pdf")],
+    "clustered": [(plot_rank_c, "exp29", "plot_clustered.pdf")],
+    "trim_clustered": [(plot_trim, "exp35", "plot_trim_clustered.pdf")],
+    "sparse_rank": [(plot_rank_b, ["exp33", "exp31", "exp32"], "plot_sparse_rank.pdf")],
+    "sparse_trim_expander": [(plot_trim, "exp34", "plot_sparse_trim_expander.pdf")],
+    "sparse_trim_cycle": [(plot_trim, "exp36", "plot_sparse_trim_cycle.pdf")],
+}
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def module_sources(path, sources=None):
+    """
+    Source file `path` and the source files of the project modules it
+    imports, transitively (e.g. plot.utils, src.store and src.decimate for
+    the plot modules).
+    """
+    sources = [] if sources is None else sources
+    if path in sources:
+        return sources
+    sources.append(path)
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # imported names may be submodules
+            names = [node.module] + [f"{node.module}.{a.name}" for a in node.names]
+        else:
+            continue
+        for name in names:
+            try:
+                spec = importlib.util.find_spec(name)
+            except (ImportError, ValueError):
+                continue
+            origin = spec.origin if spec else None
+            if origin and origin.endswith(".py") and origin.startswith(ROOT + os.sep):
+                module_sources(origin, sources)
+    return sources
+
+
+def figure_inputs(plot, exp_names):
+    """
+    Files a figure is rendered from: the plot module and the project modules
+    it imports, and the config and results of each experiment (the results
+    store, or the pickle of older runs). Returns None when the results of an
+    experiment are missing.
+    """
+    if isinstance(exp_names, str):
+        exp_names = [exp_names]
+    inputs = module_sources(inspect.getsourcefile(plot))
+    for exp_name in exp_names:
+        folder = os.path.join("results", "outputs", exp_name)
+        results_path = os.path.join(folder, "results.pkl")
+        if os.path.exists(store_path(results_path)):
+            results_path = store_path(results_path)
+        elif not os.path.exists(results_path):
+            return None
+        inputs += [os.path.join(folder, "config.yaml"), results_path]
+    return inputs
+
+
+def figure_digest(inputs):
+    digest = hashlib.sha256()
+    for path in inputs:
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def render(plot, exp_names, save_path):
+    """Render a figure to a file, without displaying it."""
+    matplotlib.use("Agg")
+    plot(exp_names, save_path=save_path)
+    plt.close("all")
+    return save_path
+
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--plot_name", type=str, required=True, help="Name of plot")
+    parser.add_argument(
+        "--plot_name",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Names of the plots, or all",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of figures rendered in parallel"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Render figures whose inputs are unchanged"
+    )
     args = parser.parse_args()
-    plot_name = args.plot_name
+    plot_names = list(FIGURES) if args.plot_name == ["all"] else args.plot_name
     path = os.path.join("results", "figures")
     os.makedirs(path, exist_ok=True)
 
-    if plot_name == "rank_a":
-        plot_rank_a("exp2", save_path="plot_rank_a.pdf")  # watts-strogatz
-    elif plot_name == "rank_a_appendix":
-        exp_names = ["exp1", "exp2", "exp3"]  # for all graphs
-        save_paths = [
-            "plot_rank_a_complete.pdf",
-            "plot_rank_a_ws.pdf",
-            "plot_rank_a_grid.pdf",
-        ]
-        for exp_name, save_path in zip(exp_names, save_paths):
-            plot_rank_a(exp_name, save_path)
-    elif plot_name == "rank_b":
-        exp_names = ["exp6", "exp5", "exp4"]
-        # exp_names = ["exp33", "exp31", "exp32"]
-        plot_rank_b(exp_names, save_path="plot_rank_b.pdf")
-    elif plot_name == "rank_c":
-        plot_rank_c("exp8", save_path="plot_rank_c.pdf")  # watts-strogatz
-    elif plot_name == "rank_c_appendix":
-        exp_names = ["exp7", "exp8", "exp9"]
-        save_paths = [
-            "plot_rank_c_ws.pdf",
-            "plot_rank_c_grid.pdf",
-            "plot_rank_c_complete.pdf",
-        ]
-        for exp_name, save_path in zip(exp_names, save_paths):
-            plot_rank_c(exp_name, save_path)
-    elif plot_name == "trim_a":
-        plot_trim_a("exp10", save_path="plot_trim_a.pdf")
-    elif plot_name == "trim_a_appendix":
-        exp_names = ["exp10", "exp10a", "exp10b"]
-        save_paths = [
-            "plot_trim_a_ws.pdf",
-            "plot_trim_a_grid.pdf",
-            "plot_trim_a_complete.pdf",
-        ]
-        for exp_name, save_path in zip(exp_names, save_paths):
-            plot_trim_a(exp_name, save_path)
-    elif plot_name == "trim_b":
-        plot_trim("exp12", save_path="plot_trim_b.pdf")
-    elif plot_name == "trim_b_appendix":
-        exp_names = ["exp11", "exp12", "exp13"]
-        save_paths = [
-            "plot_trim_b_complete.pdf",
-            "plot_trim_b_grid.pdf",
-            "plot_trim_b_ws.pdf",
-        ]
-        for exp_name, save_path in zip(exp_names, save_paths):
-            plot_trim(exp_name, save_path)
-    elif plot_name == "trim_c":
-        plot_trim("exp14", save_path="plot_trim_c.pdf")
-    elif plot_name == "rank_d_appendix":
-        exp_names = ["exp15", "exp16", "exp17"]
-        save_paths = [
-            "plot_rank_d_ws.pdf",
-            "plot_rank_d_complete.pdf",
-            "plot_rank_d_grid.pdf",
-        ]
-        for exp_name, save_path in zip(exp_names, save_paths):
-            plot_rank_c(exp_name, save_path)
-    elif plot_name == "large_rank_c":
-        exp_name = ["exp18", "exp19", "exp20"]
-        save_path = [
-            "plot_large_rank_c_ws.pdf",
-            "plot_large_rank_c_grid.pdf",
-            "plot_large_rank_c_complete.pdf",
-        ]
-        for name, path in zip(exp_name, save_path):
-            plot_rank_c(name, save_path=path)
-    elif plot_name == "xl_rank_c":
-        exp_name = ["exp21", "exp22", "exp23"]
-        save_path = [
-            "plot_xl_rank_c_ws.pdf",
-            "plot_xl_rank_c_grid.pdf",
-            "plot_xl_rank_c_complete.pdf",
-        ]
-        for name, path in zip(exp_name, save_path):
-            plot_rank_c(name, save_path=path)
-    elif plot_name == "large_trim_c":
-        exp_name = ["exp24", "exp25"]
-        save_path = [
-            "plot_large_trim_c_ws.pdf",
-            "plot_large_trim_c_grid.pdf",
-        ]
-        for name, path in zip(exp_name, save_path):
-            plot_trim(name, save_path=path)
-    elif plot_name == "xl_trim_c":
-        exp_name = ["exp26", "exp27"]
-        save_path = [
-            "plot_xl_trim_c_ws.pdf",
-            "plot_xl_trim_c_grid.pdf",
-        ]
-        for name, path in zip(exp_name, save_path):
-            plot_trim(name, save_path=path)
-    elif plot_name == "xxl_rank_c":
-        exp_name = "exp28"
-        plot_name = "plot_xxl_rank_c.pdf"
-        plot_rank_c(exp_name, save_path=plot_name)
-    elif plot_name == "xxl_trim_c":
-        exp_name = "exp28b"
-        plot_name = "plot_xxl_trim_c.pdf"
-        plot_trim(exp_name, save_path=plot_name)
-    elif plot_name == "clustered":
-        exp_name = "exp29"
-        plot_name = "plot_clustered.pdf"
-        plot_rank_c(exp_name, save_path=plot_name)
-    elif plot_name == "trim_clustered":
-        exp_name = "exp35"
-        plot_name = "plot_trim_clustered.pdf"
-        plot_trim(exp_name, save_path=plot_name)
-    elif plot_name == "sparse_rank":
-        exp_names = ["exp33", "exp31", "exp32"]
-        save_path = "plot_sparse_rank.pdf"
-        plot_rank_b(exp_names, save_path=save_path)
-    elif plot_name == "sparse_trim_expander":
-        exp_names = "exp34"
-        save_path = "plot_sparse_trim_expander.pdf"
-        plot_trim(exp_names, save_path=save_path)
-    elif plot_name == "sparse_trim_cycle":
-        exp_names = "exp36"
-        save_path = "plot_sparse_trim_cycle.pdf"
-        plot_trim(exp_names, save_path=save_path)
+    ### Build graph ###
+    # digests of the inputs of the figures rendered so far
+    build_path = os.path.join(path, "build.json")
+    built = {}
+    if os.path.exists(build_path):
+        with open(build_path) as f:
+            built = json.load(f)
+    tasks, digests = [], {}
+    for plot_name in plot_names:
+        for plot, exp_names, save_path in FIGURES[plot_name]:
+            inputs = figure_inputs(plot, exp_names)
+            if inputs is None:
+                print(f"Skipping {save_path}: missing results of {exp_names}")
+                continue
+            digest = figure_digest(inputs)
+            rendered = os.path.exists(os.path.join(path, save_path))
+            if not args.force and rendered and built.get(save_path) == digest:
+                print(f"Up to date: {save_path}")
+                continue
+            if save_path not in digests:
+                tasks.append((plot, exp_names, save_path))
+                digests[save_path] = digest
+    ### End of build graph ###
+
+    def record(done):
+        # the digests are saved even if a later figure fails
+        try:
+            for save_path in done:
+                print(f"Rendered {save_path}")
+                built[save_path] = digests[save_path]
+        finally:
+            with open(build_path, "w") as f:
+                json.dump(built, f, indent=1)
+
+    # figures are independent, so they are rendered in parallel
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(args.jobs) as pool:
+            record(pool.map(render, *zip(*tasks)))
+    else:
+        record(render(*task) for task in tasks)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import numpy as np
+from scipy.stats import trim_mean
+from src.utils import wn
+
+
+class QueueNetwork:
+    """Messages are put directly in the inbox of the recipient."""
+
+    async def start(self, actors):
+        self.actors = actors
+
+    async def send(self, sender, recipient, message):
+        self.actors[recipient].inbox.put_nowait(message)
+
+    async def close(self):
+        pass
+
+
+class TCPNetwork:
+    """
+    Each actor listens on a localhost TCP port. Messages are sent as JSON
+    lines, over one connection per pair (sender, recipient) opened on first
+    use, and put in the inbox of the recipient as they are read.
+    """
+
+    def __init__(self, host="127.0.0.1"):
+        self.host = host
+        self.servers, self.ports, self.writers, self.readers = [], {}, {}, []
+
+    async def start(self, actors):
+        self.actors = actors
+        for actor in actors:
+            server = await asyncio.start_server(
+                lambda reader, writer, actor=actor: self.receive(actor, reader),
+                self.host,
+                0,
+            )
+            self.servers.append(server)
+            self.ports[actor.node] = server.sockets[0].getsockname()[1]
+
+    async def receive(self, actor, reader):
+        self.readers.append(asyncio.current_task())
+        while line := await reader.readline():
+            actor.inbox.put_nowait(json.loads(line))
+
+    async def send(self, sender, recipient, message):
+        if (sender, recipient) not in self.writers:
+            _, writer = await asyncio.open_connection(self.host, self.ports[recipient])
+            self.writers[sender, recipient] = writer
+        writer = self.writers[sender, recipient]
+        writer.write((json.dumps(message) + "\n").encode())
+        await writer.drain()
+
+    async def close(self):
+        # readers stop at the end of the stream of their connection
+        for writer in self.writers.values():
+            writer.close()
+        await asyncio.gather(*self.readers, return_exceptions=True)
+        for server in self.servers:
+            server.close()
+
+
+NETWORKS = {"queue": QueueNetwork, "tcp": TCPNetwork}
+
+
+class Actor:
+    """
+    Node of the gossip runtime, running GoRank and GoTrim on its own value.
+    The node wakes up at the events of an exponential clock of rate `rate`
+    and asks a random neighbor for an exchange. Both nodes then swap their
+    auxiliary observations and average their estimates z. A node waiting for
+    the reply to its own request refuses the requests it receives, so that
+    each exchange is atomic.
+
+    The rank estimate is the fraction of time during which the value of the
+    node was above its auxiliary observation, i.e. GoRank in continuous time,
+    and the GoTrim weight is updated from it at each exchange.
+    """
+
+    def __init__(self, node, value, neighbors, rate, network, n, alpha, rng):
+        self.node = node
+        self.value = value
+        self.y = value
+        self.neighbors = neighbors
+        self.rate = rate
+        self.network = network
+        self.n = n
+        self.alpha = alpha
+        self.rng = rng
+        self.inbox = asyncio.Queue()
+        # comparisons won up to the time of the last swap
+        self.won = 0.0
+        self.last = 0.0
+        self.above = False
+        self.z = 0.0
+        self.w = 0.0
+        # neighbor and time of the request waiting for a reply
+        self.pending = None
+        self.latencies = []
+        self.exchanges = 0
+        self.refused = 0
+
+    def ranking(self, now):
+        """Rank estimate at time `now`, in [0, 1]."""
+        return (self.won + self.above * (now - self.last)) / max(now, 1e-9)
+
+    def correct(self, now):
+        """Update the GoTrim weight and the estimate z accordingly."""
+        w = self.n * wn(self.n, np.array([self.n * self.ranking(now) + 1]), self.alpha)
+        self.z += (w[0] - self.w) * self.value
+        self.w = w[0]
+
+    def swap(self, y, now):
+        self.won += self.above * (now - self.last)
+        self.last = now
+        self.y = y
+        self.above = self.value > self.y
+
+    async def send(self, recipient, message):
+        await self.network.send(self.node, recipient, {"sender": self.node, **message})
+
+    async def handle(self, message, now):
+        kind, sender = message["kind"], message["sender"]
+        if kind == "request":
+            if self.pending is not None:
+                self.refused += 1
+                await self.send(sender, {"kind": "busy"})
+                return
+            self.correct(now)
+            average = (self.z + message["z"]) / 2
+            await self.send(sender, {"kind": "accept", "y": self.y, "z": average})
+            self.swap(message["y"], now)
+            self.z = average
+            self.exchanges += 1
+        elif kind == "accept":
+            self.swap(message["y"], now)
+            self.z = message["z"]
+            self.latencies.append(now - self.pending[1])
+            self.exchanges += 1
+            self.pending = None
+        elif kind == "busy":
+            self.pending = None
+
+    async def run(self, clock, until):
+        wake = self.rng.exponential(1 / self.rate)
+        while (now := clock()) < until:
+            if now >= wake:
+                wake += self.rng.exponential(1 / self.rate)
+                if self.pending is None:
+                    neighbor = int(self.rng.choice(self.neighbors))
+                    self.correct(now)
+                    self.pending = (neighbor, now)
+                    await self.send(
+                        neighbor, {"kind": "request", "y": self.y, "z": self.z}
+                    )
+                continue
+            try:
+                message = await asyncio.wait_for(
+                    self.inbox.get(), min(wake, until) - now
+                )
+            except asyncio.TimeoutError:
+                continue
+            await self.handle(message, clock())
+
+
+async def gossip_runtime(
+    graph, data, duration, rates, transport="queue", alpha=0.1, every=0.1, seed=42
+):
+    """
+    Run one actor per node of a src.graph.Graph for `duration` seconds, the
+    actor of node i holding data[i] and waking up at rate rates[i] per second.
+    The errors of the rank estimates and of the GoTrim estimates are sampled
+    every `every` seconds.
+    """
+    n = graph.n
+    true_ranks = np.argsort(np.argsort(data)) / n
+    true_value = trim_mean(data, alpha)
+    network = NETWORKS[transport]()
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n)]
+    actors = [
+        Actor(
+            i, float(data[i]), graph.neighbors(i), rates[i], network, n, alpha, rngs[i]
+        )
+        for i in range(n)
+    ]
+    await network.start(actors)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    def clock():
+        return loop.time() - start
+
+    curve = {"time": [], "exchanges": [], "rank_error": [], "mean_error": []}
+
+    async def monitor():
+        while (now := clock()) < duration:
+            ranking = np.array([actor.ranking(now) for actor in actors])
+            z = np.array([actor.z for actor in actors])
+            curve["time"].append(now)
+            curve["exchanges"].append(sum(actor.exchanges for actor in actors) // 2)
+            curve["rank_error"].append(np.mean(np.abs(ranking - true_ranks)))
+            curve["mean_error"].append(np.mean(np.abs(z - true_value)))
+            await asyncio.sleep(every)
+
+    await asyncio.gather(monitor(), *[actor.run(clock, duration) for actor in actors])
+    elapsed = clock()
+    await network.close()
+
+    latencies = np.concatenate([actor.latencies for actor in actors]) * 1e3
+    exchanges = sum(len(actor.latencies) for actor in actors)
+    return {
+        "n": n,
+        "edges": graph.number_of_edges(),
+        "transport": transport,
+        "duration": elapsed,
+        "exchanges": exchanges,
+        "refused": sum(actor.refused for actor in actors),
+        "throughput": exchanges / elapsed,
+        "latency_ms": {
+            "mean": float(np.mean(latencies)) if exchanges else None,
+            "p50": float(np.percentile(latencies, 50)) if exchanges else None,
+            "p99": float(np.percentile(latencies, 99)) if exchanges else None,
+        },
+        "curve": {name: [float(v) for v in values] for name, values in curve.items()},
+    }
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class RunningStats:
+    """
+    Running mean and variance of a curve (or of any array of fixed shape),
+    folded one trial at a time with Welford's algorithm in O(length) memory.
+    Partial aggregates, e.g. from several worker processes, are combined with
+    `merge` (Chan et al. parallel update). Optionally tracks min and max.
+    """
+
+    def __init__(self, shape, extrema=False):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.extrema = extrema
+        if extrema:
+            self.min = np.full(shape, np.inf)
+            self.max = np.full(shape, -np.inf)
+
+    def update(self, value):
+        """Fold the value of one trial."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.extrema:
+            np.minimum(self.min, value, out=self.min)
+            np.maximum(self.max, value, out=self.max)
+
+    def merge(self, other):
+        """Fold the partial aggregate of other trials."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * (other.count / count)
+        self.m2 += other.m2 + delta**2 * (self.count * other.count / count)
+        self.count = count
+        if self.extrema:
+            np.minimum(self.min, other.min, out=self.min)
+            np.maximum(self.max, other.max, out=self.max)
+
+    @property
+    def var(self):
+        return self.m2 / max(self.count, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
@@ -0,0 +1,256 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from src.utils import wn, PRECISIONS
+
+
+class BatchRankEstimate(ABC):
+    """
+    Abstract class for ranking estimates run on a batch of independent trials.
+    Every state array carries a leading trial axis, i.e. has shape (n_trials, n).
+    Each update receives arrays i, j of shape (n_trials, k): trial r activates
+    the k disjoint edges (i[r, l], j[r, l]), i.e. one edge when k = 1 or a
+    matching of the graph. As in the sequential versions, GoRank and GoTrim
+    also accept data of shape (n_trials, n, d), with d signals per node.
+    """
+
+    def __init__(self, horizon, n, data, precision="double"):
+        self.horizon = horizon
+        self.n = n
+        self.data = data.copy()
+        self.dtypes = PRECISIONS[precision]
+        self.n_trials = data.shape[0]
+        self.rows = np.arange(self.n_trials)[:, None]
+        self.name = "Ranking"
+
+    @abstractmethod
+    def update(self, t, i, j):
+        pass
+
+
+class BatchGoRankEstimate(BatchRankEstimate):
+    """
+    Batched version of GoRankEstimate
+    """
+
+    def __init__(self, horizon, n, data, precision="double"):
+        super().__init__(horizon, n, data, precision)
+        self.y_data = data.copy()
+        self.count = np.zeros(data.shape, dtype=self.dtypes["count"])
+        self.last = np.zeros(data.shape, dtype=self.dtypes["count"])
+        self.above = np.zeros(data.shape, dtype=bool)
+        self.t = 0
+        self.weight = 1
+        self.name = "GoRank (ours)"
+        self.local = False
+
+    @property
+    def ranking(self):
+        return (self.count + self.above * (self.t - self.last)) / max(self.t, 1)
+
+    def update(self, t, i, j):
+        rows = self.rows
+        # Bring the comparison counts of nodes i and j up to time t
+        for node in [i, j]:
+            self.count[rows, node] += self.above[rows, node] * (
+                t - self.last[rows, node]
+            )
+            self.last[rows, node] = t
+        # Swap auxiliary observations
+        self.y_data[rows, i], self.y_data[rows, j] = (
+            self.y_data[rows, j],
+            self.y_data[rows, i],
+        )
+        for node in [i, j]:
+            self.above[rows, node] = self.data[rows, node] > self.y_data[rows, node]
+        self.t = t
+
+
+class BatchGoRankEstimateAsync(BatchRankEstimate):
+    """
+    Batched version of GoRankEstimateAsync
+    """
+
+    def __init__(self, horizon, n, data, precision="double"):
+        super().__init__(horizon, n, data, precision)
+        self.y_data = data.copy()
+        self.weight = 1
+        self.name = "GoRank Async (ours)"
+        self.local = True
+        self.ranking = np.zeros(data.shape, dtype=self.dtypes["value"])
+        self.count = np.zeros(data.shape, dtype=self.dtypes["count"])
+
+    def update(self, t, i, j):
+        rows = self.rows
+        # Update auxiliary rank estimates
+        for node in [i, j]:
+            self.count[rows, node] += 1
+            count = self.count[rows, node]
+            self.ranking[rows, node] = (
+                (count - 1) * self.ranking[rows, node]
+                + (self.data[rows, node] > self.y_data[rows, node])
+            ) / count
+        # Swap auxiliary observations
+        self.y_data[rows, i], self.y_data[rows, j] = (
+            self.y_data[rows, j],
+            self.y_data[rows, i],
+        )
+
+
+class BatchImprovedBaselineEstimate(BatchRankEstimate):
+    """
+    Batched version of ImprovedBaselineEstimate
+    """
+
+    def __init__(self, horizon, n, data, precision="double"):
+        super().__init__(horizon, n, data, precision)
+        self.ranking = np.zeros(data.shape, dtype=self.dtypes["rank"])
+        self.ranking[:] = np.arange(n)
+        self.aux_r = np.zeros(data.shape, dtype=self.dtypes["rank"])
+        self.aux_r[:] = np.arange(n)
+        self.aux_x = data.astype(float)
+        self.weight = 1 / n
+        self.name = "Baseline++ (ours)"
+        self.local = True
+
+    def update(self, t, i, j):
+        rows = self.rows
+        r_i, r_j = self.aux_r[rows, i], self.aux_r[rows, j]
+        x_i, x_j = self.aux_x[rows, i], self.aux_x[rows, j]
+
+        # If auxiliary rankings contradict auxiliary observations, swap
+        swap = (x_i - x_j) * (r_i - r_j) < 0
+        r_i, r_j = np.where(swap, r_j, r_i), np.where(swap, r_i, r_j)
+
+        # Update local rank with auxiliary rank if there is a contradiction
+        for node, r_node, x_node in [(i, r_i, x_i), (j, r_j, x_j)]:
+            ranking = self.ranking[rows, node]
+            predicted_diff = ranking - r_node
+            truth_diff = self.data[rows, node] - x_node
+            contradiction = (truth_diff * predicted_diff < 0) | (truth_diff == 0)
+            self.ranking[rows, node] = np.where(contradiction, r_node, ranking)
+
+        # Swap auxiliary variables
+        self.aux_r[rows, i], self.aux_r[rows, j] = r_j, r_i
+        self.aux_x[rows, i], self.aux_x[rows, j] = x_j, x_i
+
+
+class BatchBaselineEstimate(BatchRankEstimate):
+    """
+    Batched version of BaselineEstimate
+    """
+
+    def __init__(self, horizon, n, data, precision="double"):
+        super().__init__(horizon, n, data, precision)
+        self.ranking = np.zeros(data.shape, dtype=self.dtypes["rank"])
+        self.ranking[:] = np.arange(n)
+        self.aux_r = np.zeros(data.shape, dtype=self.dtypes["rank"])
+        self.aux_r[:] = np.arange(n)
+        self.aux_x = data.astype(float)
+        self.aux_i = np.zeros(data.shape, dtype=self.dtypes["index"])
+        self.aux_i[:] = np.arange(n)
+        self.weight = 1 / n
+        self.name = "Baseline (Chiuso et al.)"
+        self.local = True
+
+    def update(self, t, i, j):
+        rows = self.rows
+        s_i, s_j = self.ranking[rows, i], self.ranking[rows, j]
+        r_i, r_j = self.aux_r[rows, i], self.aux_r[rows, j]
+        x_i, x_j = self.aux_x[rows, i], self.aux_x[rows, j]
+        k_i, k_j = self.aux_i[rows, i], self.aux_i[rows, j]
+
+        # Swap rankings if necessary
+        swap = (self.data[rows, i] - self.data[rows, j]) * (s_i - s_j) < 0
+        self.ranking[rows, i] = np.where(swap, s_j, s_i)
+        self.ranking[rows, j] = np.where(swap, s_i, s_j)
+
+        # Swap auxiliary rankings if necessary
+        swap = (x_i - x_j) * (r_i - r_j) < 0
+        r_i, r_j = np.where(swap, r_j, r_i), np.where(swap, r_i, r_j)
+
+        # Swap auxiliary variables
+        self.aux_i[rows, i], self.aux_i[rows, j] = k_j, k_i
+        self.aux_r[rows, i], self.aux_r[rows, j] = r_j, r_i
+        self.aux_x[rows, i], self.aux_x[rows, j] = x_j, x_i
+
+        # Update local ranking estimates
+        for p in [i, j]:
+            owner = self.aux_i[rows, p] == p
+            self.ranking[rows, p] = np.where(
+                owner, self.aux_r[rows, p], self.ranking[rows, p]
+            )
+
+
+class BatchMeanEstimate:
+    """
+    Batched version of MeanEstimate. As in the sequential version, the
+    correction of step t is applied to the estimate of step t - 1, which is
+    exposed as `z_prev` once `update_mean` returns.
+    """
+
+    def __init__(self, horizon, n, data, alpha, rank_class, precision="double"):
+        self.horizon = horizon
+        self.n = n
+        self.alpha = alpha
+        self.value = PRECISIONS[precision]["value"]
+        self.data = data.astype(self.value)
+        self.rows = np.arange(data.shape[0])[:, None]
+        self.z = np.zeros(data.shape, dtype=self.value)
+        self.z_prev = self.z
+        self.w = np.zeros(data.shape, dtype=self.value)
+        self.rank = rank_class(horizon, n, data, precision)
+        self.weight = self.rank.weight * n
+        self.name = "GoTrim + " + self.rank.name
+        self.local = False
+
+    def update_mean(self, t, i, j):
+        rows = self.rows
+        # update dynamic weights
+        w = self.n * wn(self.n, self.weight * self.rank.ranking + 1, self.alpha)
+        w = w.astype(self.value, copy=False)
+
+        # update z estimate of all nodes
+        self.z_prev = self.z + (w - self.w) * self.data
+        self.w = w
+
+        # update z estimate for nodes i, j
+        self.z = self.z_prev.copy()
+        avg = (self.z_prev[rows, i] + self.z_prev[rows, j]) / 2
+        self.z[rows, i] = avg
+        self.z[rows, j] = avg
+
+
+class BatchClippedGossip:
+    """
+    Batched version of ClippedGossip
+    """
+
+    def __init__(self, horizon, n, data, tau, precision="double"):
+        self.horizon = horizon
+        self.n = n
+        self.tau = tau
+        self.data = data.copy()
+        self.rows = np.arange(data.shape[0])[:, None]
+        self.z = data.astype(PRECISIONS[precision]["value"])
+        self.name = "Clipped Gossip (He et al.)"
+        self.local = True
+
+    def clip(self, z, tau):
+        # differences of shape (n_trials, k, d) are clipped in norm
+        if z.ndim > 2:
+            norm = np.linalg.norm(z, axis=-1, keepdims=True)
+        else:
+            norm = np.abs(z)
+        factor = np.minimum(1, tau / np.where(norm > 0, norm, 1))
+        return factor * z
+
+    def update_mean(self, t, i, j):
+        rows = self.rows
+        xi_prev = self.z[rows, i]
+        xj_prev = self.z[rows, j]
+
+        delta = xj_prev - xi_prev
+        clipped_delta = self.clip(delta, self.tau)
+
+        self.z[rows, i] = xi_prev + 0.5 * clipped_delta
+        self.z[rows, j] = xj_prev - 0.5 * clipped_delta
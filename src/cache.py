@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import numpy as np
+from src.graph import Graph, graph_params, GRAPH_VERSIONS
+from src.utils import compute_connectivity
+
+CACHE_FOLDER = os.path.join("results", "cache", "graphs")
+# bump when the generators change, to invalidate the cached graphs
+CACHE_VERSION = 3
+
+
+def graph_key(spec):
+    """Content address of a graph, given a dict describing how it is built."""
+    text = json.dumps(dict(spec, version=CACHE_VERSION), sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def cached_graph(spec, build, folder=CACHE_FOLDER, connect=compute_connectivity):
+    """
+    Graph returned by `build()` and its connectivity lambda_2/|E|, computed
+    by `connect(graph)`. The edges
+    and the connectivity are saved in `folder` under the key of `spec`, so
+    that later runs skip the generation and the eigen-solve.
+    Files are written to a temporary name then renamed, so that concurrent
+    runs never read a partial file.
+    """
+    path = os.path.join(folder, f"{graph_key(spec)}.npz")
+    if os.path.exists(path):
+        with np.load(path) as cache:
+            graph = Graph(int(cache["n"]), cache["edges"])
+            return graph, float(cache["connectivity"])
+    graph = build()
+    connectivity = connect(graph)
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            n=graph.n,
+            edges=graph.edges,
+            connectivity=connectivity,
+            spec=json.dumps(spec),
+        )
+    os.replace(tmp_path, path)
+    return graph, connectivity
+
+
+def graph_spec(n, type, seed, params=None):
+    """Description of the graph built by generate_graph(n, type, seed, params)."""
+    params = graph_params(type, params)
+    spec = {"n": n, "type": type, "seed": seed, "params": params}
+    if type in GRAPH_VERSIONS:
+        spec["version"] = GRAPH_VERSIONS[type]
+    return spec
+
+
+def file_digest(path):
+    """SHA-256 of the content of a file."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
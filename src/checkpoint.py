@@ -0,0 +1,82 @@
+import numpy as np
+import os
+import pickle
+import re
+import time
+
+
+def save_pickle(obj, path):
+    """Pickle `obj` to `path` atomically, through a temporary file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def block_path(folder, trials, suffix=""):
+    """Path of the checkpoint of the block of the given trials."""
+    return os.path.join(folder, f"block_{trials[0]}_{trials[-1] + 1}{suffix}.pkl")
+
+
+def completed_blocks(folder):
+    """Sorted (start, stop) trial ranges of the blocks checkpointed in `folder`."""
+    blocks = []
+    for name in os.listdir(folder):
+        match = re.fullmatch(r"block_(\d+)_(\d+)\.pkl", name)
+        if match:
+            blocks.append((int(match.group(1)), int(match.group(2))))
+    return sorted(blocks)
+
+
+def extension_seed(seed_seq, horizon):
+    """
+    Random stream of the steps of a trial from `horizon` on, used when the
+    horizon of a finished experiment is extended.
+    """
+    return np.random.SeedSequence(
+        seed_seq.entropy, spawn_key=seed_seq.spawn_key + (horizon,)
+    )
+
+
+class BlockCheckpoint:
+    """
+    Checkpoint of a block of trials run by an engine. The in-flight state of
+    the block (estimates, metrics and partial aggregates) is pickled at most
+    every `every` seconds, so that an interrupted block resumes from its last
+    state. With `keep`, the final states of the trials are collected in
+    `states`, so that their horizon can be extended later; otherwise only
+    the aggregates of the finished trials are kept. `previous` holds the
+    states of a run with a shorter horizon, to be extended.
+    """
+
+    def __init__(self, path, every, horizon, previous=None, keep=False):
+        self.path = path
+        self.every = every
+        self.horizon = horizon
+        self.previous = previous
+        self.keep = keep
+        self.states = []
+        self.last = time.perf_counter()
+
+    def due(self):
+        return time.perf_counter() - self.last >= self.every
+
+    def save(self, state):
+        save_pickle({"horizon": self.horizon, **state}, self.path)
+        self.last = time.perf_counter()
+
+    def load(self):
+        """Last in-flight state of the block, or None."""
+        if not os.path.exists(self.path):
+            return None
+        state = load_pickle(self.path)
+        return state if state["horizon"] == self.horizon else None
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,59 @@
+import numpy as np
+
+# points of the decimated curves saved with the results
+LOD_POINTS = 2000
+# keys of the decimated curves of each estimator in the results
+LOD_KEYS = ["lod_timesteps", "lod_mean", "lod_lower", "lod_upper"]
+
+
+def buckets(size, points):
+    """
+    Bounds of the buckets of the Largest-Triangle-Three-Buckets algorithm:
+    the first and last points are buckets of their own, and the points in
+    between are split in points - 2 buckets of equal size.
+    """
+    inner = np.linspace(1, size - 1, points - 1).astype(int)
+    return np.concatenate([[0], inner, [size]])
+
+
+def lttb(x, y, points=LOD_POINTS):
+    """
+    Indices of `points` points of the curve (x, y) selected by the
+    Largest-Triangle-Three-Buckets algorithm, which keeps the visual shape
+    of the curve: in each bucket, the point forming the largest triangle
+    with the point selected in the previous bucket and the mean of the next
+    bucket is selected.
+    """
+    size = len(x)
+    if size <= points or points < 3:
+        return np.arange(size)
+    bounds = buckets(size, points)
+    selected = np.zeros(points, dtype=int)
+    selected[-1] = size - 1
+    for b in range(1, points - 1):
+        start, stop = bounds[b], bounds[b + 1]
+        next_x = x[stop : bounds[b + 2]].mean()
+        next_y = y[stop : bounds[b + 2]].mean()
+        a = selected[b - 1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (next_y - y[a])
+        )
+        selected[b] = start + np.argmax(area)
+    return selected
+
+
+def decimate(x, mean, std, points=LOD_POINTS):
+    """
+    Decimated error curve, as the points of the mean curve selected by LTTB
+    and the min-max envelope of the band mean ± std over each bucket, so that
+    the band keeps its extent. Returns x, mean, lower and upper.
+    """
+    lower, upper = mean - std, mean + std
+    if len(x) <= points or points < 3:
+        return x, mean, lower, upper
+    selected = lttb(x, mean, points)
+    starts = buckets(len(x), points)[:-1]
+    lower = np.minimum.reduceat(lower, starts)
+    upper = np.maximum.reduceat(upper, starts)
+    return x[selected], mean[selected], lower, upper
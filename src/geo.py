@@ -0,0 +1,48 @@
+import numpy as np
+import networkx as nx
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS = 6371  # Radius of earth in kilometers
+
+
+def radius_edges(latitude, longitude, radius=1.0):
+    """
+    Pairs of points closer than `radius` km on the earth, found in bulk with a
+    radius query of a BallTree on the haversine metric.
+
+    Parameters:
+        latitude (np.ndarray): Latitudes of the points, in degrees.
+        longitude (np.ndarray): Longitudes of the points, in degrees.
+        radius (float): Distance threshold, in kilometers.
+
+    Returns:
+        np.ndarray: Sorted int array of shape (m, 2) with u < v in each row.
+    """
+    points = np.radians(np.column_stack([latitude, longitude]))
+    tree = BallTree(points, metric="haversine")
+    neighbors, distances = tree.query_radius(
+        points, r=radius / EARTH_RADIUS, return_distance=True
+    )
+    u = np.repeat(np.arange(len(points)), [len(v) for v in neighbors])
+    v = np.concatenate(neighbors)
+    distances = EARTH_RADIUS * np.concatenate(distances)
+    keep = (u < v) & (distances < radius)
+    edges = np.stack([u[keep], v[keep]], axis=1)
+    return edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+
+def geo_graph(latitude, longitude, radius=1.0, **attributes):
+    """
+    Graph connecting the points closer than `radius` km. Node i has the
+    position `pos`, its `latitude` and `longitude` and, for each keyword
+    argument, the i-th value of the given array as attribute.
+    """
+    G = nx.Graph()
+    for i, (lat, lon) in enumerate(zip(latitude, longitude)):
+        G.add_node(i, pos=(lat, lon))
+    G.add_edges_from(radius_edges(latitude, longitude, radius).tolist())
+    for name, values in attributes.items():
+        nx.set_node_attributes(G, dict(enumerate(values)), name)
+    nx.set_node_attributes(G, dict(enumerate(latitude)), "latitude")
+    nx.set_node_attributes(G, dict(enumerate(longitude)), "longitude")
+    return G
@@ -1,39 +1,154 @@
 import numpy as np
 import networkx as nx
-import random
+import pickle
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.csgraph import connected_components
 
+# types of graphs of generate_graph
+GRAPH_TYPES = [
+    "Complete",
+    "Watts-Strogatz",
+    "2D Grid",
+    "Cycle",
+    "Clustered",
+    "Tree",
+    "Expander",
+]
+# parameters of the random graph generators, also part of the graph cache key
+GRAPH_PARAMS = {
+    "Watts-Strogatz": {"k": 4, "p": 0.4},
+    "Clustered": {"clusters": 3, "intra_prob": 0.3, "inter_edges": 5},
+    "Expander": {"degree": 3},
+}
+# versions of the generators that changed the graphs drawn for some
+# parameters, also part of the graph cache key
+GRAPH_VERSIONS = {"Clustered": 2}
 
-def generate_graph(n, type="Watts-Strogatz", seed=42):
+
+def graph_params(type, params=None):
+    """Parameters of a graph generator, with `params` overriding the defaults."""
+    return {**GRAPH_PARAMS.get(type, {}), **(params or {})}
+
+
+class Graph:
+    """
+    Undirected graph on the nodes 0, ..., n - 1, stored as an int32 array of
+    edges of shape (m, 2) and as a CSR adjacency: the neighbors of node i
+    are indices[indptr[i]:indptr[i + 1]], in increasing order.
+    """
+
+    def __init__(self, n, edges):
+        self.n = n
+        self.edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        heads = np.concatenate([self.edges[:, 0], self.edges[:, 1]])
+        tails = np.concatenate([self.edges[:, 1], self.edges[:, 0]])
+        order = np.lexsort((tails, heads))
+        self.indices = tails[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=n), out=self.indptr[1:])
+
+    @classmethod
+    def from_networkx(cls, G):
+        """Graph of a networkx graph whose nodes are 0, ..., n - 1."""
+        edges = np.array(G.edges, dtype=np.int32).reshape(-1, 2)
+        return cls(G.number_of_nodes(), edges)
+
+    def to_networkx(self):
+        G = nx.Graph()
+        G.add_nodes_from(range(self.n))
+        G.add_edges_from(self.edges.tolist())
+        return G
+
+    def number_of_nodes(self):
+        return self.n
+
+    def number_of_edges(self):
+        return len(self.edges)
+
+    @property
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i] : self.indptr[i + 1]]
+
+    def adjacency(self):
+        """Sparse adjacency matrix."""
+        ones = np.ones(len(self.indices))
+        return csr_matrix((ones, self.indices, self.indptr), shape=(self.n, self.n))
+
+    def laplacian(self):
+        """Sparse Laplacian matrix D - A."""
+        return (diags(self.degree.astype(float)) - self.adjacency()).tocsr()
+
+    def is_connected(self):
+        return connected_components(self.adjacency(), directed=False)[0] == 1
+
+
+def grid_edges(length, width):
+    """Edges of nx.grid_2d_graph(length, width), in the same order."""
+    nodes = np.arange(length * width).reshape(length, width)
+    down = np.stack([nodes[:-1].ravel(), nodes[1:].ravel()], axis=1)
+    right = np.stack([nodes[:, :-1].ravel(), nodes[:, 1:].ravel()], axis=1)
+    edges = np.concatenate([down, right])
+    kind = np.repeat([0, 1], [len(down), len(right)])
+    return edges[np.lexsort((kind, edges[:, 0]))]
+
+
+def generate_graph(n, type="Watts-Strogatz", seed=42, params=None, attempts=100):
+    """
+    Graph of the given type on n nodes. Edges are listed in the same order
+    as in the corresponding networkx graph, which is only built for the
+    generators networkx provides. Disconnected graphs are drawn again with
+    the next seeds, `attempts` times at most.
+    """
+    params = graph_params(type, params)
     if type == "Complete":
-        G = nx.complete_graph(n)
+        G = Graph(n, np.stack(np.triu_indices(n, 1), axis=1))
     elif type == "Watts-Strogatz":
-        k = 4  # Average degree for Watts-Strogatz
-        p = 0.4  # Rewiring probability
-        G = nx.watts_strogatz_graph(n, k, p, seed=seed)
+        # average degree k and rewiring probability p
+        G = Graph.from_networkx(nx.watts_strogatz_graph(n, **params, seed=seed))
     elif type == "2D Grid":
         length, width = best_side_from_surface(n)
-        G = nx.grid_2d_graph(length, width)
-        G = nx.convert_node_labels_to_integers(G)
+        G = Graph(n, grid_edges(length, width))
     elif type == "Cycle":
-        G = nx.cycle_graph(n)
+        path = np.stack([np.arange(1, n - 1), np.arange(2, n)], axis=1)
+        G = Graph(n, np.concatenate([[[0, 1], [0, n - 1]], path]))
     elif type == "Clustered":
-        G = clustered_graph(n)
+        G = Graph(n, clustered_edges(n, **params, seed=seed))
     elif type == "Tree":
-        G = nx.random_tree(n, seed=seed)
+        G = Graph.from_networkx(nx.random_tree(n, seed=seed))
     elif type == "Expander":
-        G = nx.random_regular_graph(3, n, seed=seed)
+        G = Graph.from_networkx(nx.random_regular_graph(params["degree"], n, seed=seed))
     else:
         raise ValueError("Wrong graph type.")
     # print number of edges
     print(f"Number of edges in {type} graph: {G.number_of_edges()}")
     # check if graph is connected
-    if not nx.is_connected(G):
+    if not G.is_connected():
+        if attempts <= 1:
+            raise ValueError(f"No connected {type} graph found with these parameters.")
         print("Graph is not connected. Generating a new graph.")
-        return generate_graph(n, type, seed + 1)
+        return generate_graph(n, type, seed + 1, params, attempts - 1)
     else:
         return G
 
 
+def load_graph(path, attribute="temperature"):
+    """
+    Graph and node values of a pickled networkx graph with nodes
+    0, ..., n - 1, such as the sensor graphs data/graph_<threshold>.pkl.
+    With a list of attributes, the values have shape (n, d).
+    """
+    with open(path, "rb") as f:
+        G = pickle.load(f)
+    if isinstance(attribute, str):
+        values = np.array([G.nodes[i][attribute] for i in G.nodes()])
+    else:
+        values = np.array([[G.nodes[i][a] for a in attribute] for i in G.nodes()])
+    return Graph.from_networkx(G), values
+
+
 def best_side_from_surface(S):
     root = int(S**0.5)
     for i in range(root, 0, -1):
@@ -42,6 +157,106 @@ def best_side_from_surface(S):
             return (i, j)
 
 
+def pair_from_index(k):
+    """
+    Pairs (u, v), u < v, of the indices k of the strict upper triangle of a
+    matrix enumerated column by column: k = v (v - 1) / 2 + u.
+    """
+    k = np.asarray(k, dtype=np.int64)
+    v = ((1 + np.sqrt(1 + 8 * k.astype(float))) // 2).astype(np.int64)
+    # fix rounding errors of the square root for large k
+    v -= v * (v - 1) // 2 > k
+    v += (v + 1) * v // 2 <= k
+    return k - v * (v - 1) // 2, v
+
+
+def bernoulli_pairs(size, prob, rng):
+    """
+    Pairs u < v of `size` nodes, each kept independently with probability
+    `prob`, sampled in O(number of pairs kept) by drawing the geometric gaps
+    between consecutive kept pairs.
+    """
+    total = size * (size - 1) // 2
+    if total == 0 or prob <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if prob >= 1:
+        return pair_from_index(np.arange(total))
+    indices = []
+    last = -1
+    while last < total:
+        # enough gaps to cover the remaining pairs with high probability
+        count = int((total - last) * prob + 5 * np.sqrt(total * prob) + 10)
+        gaps = rng.geometric(prob, size=count)
+        chunk = last + np.cumsum(gaps)
+        indices.append(chunk[chunk < total])
+        last = chunk[-1]
+    return pair_from_index(np.concatenate(indices))
+
+
+def join_components(size, u, v, rng):
+    """
+    Edges (u, v) of a graph on `size` nodes, with edges chaining its
+    connected components through a random node of each, so that it is
+    connected. A connected graph is returned as is, without drawing from
+    `rng`.
+    """
+    adjacency = csr_matrix((np.ones(len(u)), (u, v)), shape=(size, size))
+    count, labels = connected_components(adjacency, directed=False)
+    if count == 1:
+        return u, v
+    # the first node of each component in a random order of the nodes
+    order = rng.permutation(size)
+    nodes = order[np.unique(labels[order], return_index=True)[1]]
+    return np.concatenate([u, nodes[:-1]]), np.concatenate([v, nodes[1:]])
+
+
+def clustered_edges(n, clusters=3, intra_prob=0.3, inter_edges=5, seed=42):
+    """
+    Edges of a graph with `n` nodes divided into `clusters` clusters of
+    consecutive nodes. Each pair of nodes of a cluster is connected with
+    probability `intra_prob`, and `inter_edges` edges connect different
+    clusters. The graph is always connected: the components of a sparse
+    cluster are chained by a few more edges, and the first clusters - 1
+    inter-cluster edges join consecutive clusters.
+
+    Returns:
+        np.ndarray: Sorted int32 array of shape (m, 2) with u < v in each row.
+    """
+    rng = np.random.default_rng(seed)
+    bounds = np.arange(clusters + 1) * (n // clusters)
+    bounds[-1] = n  # last cluster may take the remainder
+    sizes = np.diff(bounds)
+
+    # Intra-cluster connections
+    blocks = []
+    for start, size in zip(bounds[:-1], sizes):
+        u, v = join_components(size, *bernoulli_pairs(size, intra_prob, rng), rng)
+        blocks.append(
+            np.stack([start + np.minimum(u, v), start + np.maximum(u, v)], axis=1)
+        )
+    if clusters == 1:
+        return clean_edges(np.concatenate(blocks), n)
+
+    # Inter-cluster edges, a chain of clusters first
+    count = max(inter_edges, clusters - 1)
+    c1 = rng.integers(clusters, size=count)
+    c2 = (c1 + rng.integers(1, clusters, size=count)) % clusters
+    c1[: clusters - 1] = np.arange(clusters - 1)
+    c2[: clusters - 1] = np.arange(1, clusters)
+    u = bounds[c1] + rng.integers(sizes[c1])
+    v = bounds[c2] + rng.integers(sizes[c2])
+    blocks.append(np.stack([np.minimum(u, v), np.maximum(u, v)], axis=1))
+    return clean_edges(np.concatenate(blocks), n)
+
+
+def clean_edges(edges, n):
+    """Sorted int32 edges (u, v) with u < v, without duplicates."""
+    # duplicate edges are dropped, encoded as u * n + v
+    keys = np.sort(edges[:, 0] * np.int64(n) + edges[:, 1])
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+    return np.stack([keys // n, keys % n], axis=1).astype(np.int32)
+
+
 def clustered_graph(n, clusters=3, intra_prob=0.3, inter_edges=5, seed=42):
     """
     Generate a graph with `n` nodes divided into `clusters` clusters.
@@ -57,31 +272,7 @@ def clustered_graph(n, clusters=3, intra_prob=0.3, inter_edges=5, seed=42):
     Returns:
         networkx.Graph: The generated clustered graph.
     """
-    random.seed(seed)
-    nodes_per_cluster = n // clusters
     G = nx.Graph()
-    cluster_nodes = []
-
-    # Create clusters
-    for i in range(clusters):
-        start = i * nodes_per_cluster
-        end = (
-            start + nodes_per_cluster if i < clusters - 1 else n
-        )  # last cluster may take the remainder
-        nodes = list(range(start, end))
-        cluster_nodes.append(nodes)
-
-        # Intra-cluster connections
-        for u in nodes:
-            for v in nodes:
-                if u < v and random.random() < intra_prob:
-                    G.add_edge(u, v)
-
-    # Inter-cluster edges
-    for _ in range(inter_edges):
-        c1, c2 = random.sample(range(clusters), 2)
-        u = random.choice(cluster_nodes[c1])
-        v = random.choice(cluster_nodes[c2])
-        G.add_edge(u, v)
-
+    G.add_nodes_from(range(n))
+    G.add_edges_from(clustered_edges(n, clusters, intra_prob, inter_edges, seed))
     return G
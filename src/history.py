@@ -0,0 +1,93 @@
+import numpy as np
+import os
+
+# bytes of snapshots written between two flushes of an on-disk history
+CHUNK_BYTES = 64 * 2**20
+
+
+def snapshot_times(horizon, policy="dense", every=1, num=100):
+    """
+    Time steps at which a history is recorded.
+
+    Parameters:
+        horizon (int): Number of time steps of the simulation.
+        policy (str): "dense" (every step), "strided" (every `every` steps),
+            "log" (about `num` log-spaced steps) or "none".
+        every (int): Stride of the "strided" policy.
+        num (int): Number of snapshots of the "log" policy.
+
+    Returns:
+        np.ndarray: Sorted time steps, always including the first and last
+        steps unless the policy is "none".
+    """
+    if policy == "dense":
+        return np.arange(horizon)
+    elif policy == "strided":
+        times = np.arange(0, horizon, every)
+    elif policy == "log":
+        times = np.geomspace(1, max(horizon - 1, 1), num).astype(int)
+        times = np.concatenate([[0], times])
+    elif policy == "none":
+        return np.zeros(0, dtype=int)
+    else:
+        raise ValueError("Wrong history policy.")
+    return np.unique(np.concatenate([times, [horizon - 1]]))
+
+
+class History:
+    """
+    Snapshots of a state vector of size n (or of any shape given as a tuple),
+    kept only at the given time steps. Snapshots must be recorded in
+    increasing time order.
+    When `path` is given, snapshots are appended to a .npy file mapped in
+    memory and flushed to disk chunk by chunk, so that histories larger than
+    memory can be recorded. The file can then be opened lazily with
+    np.load(path, mmap_mode="r").
+    """
+
+    def __init__(self, n, times, path=None, dtype=float):
+        self.times = np.asarray(times, dtype=int)
+        shape = n if isinstance(n, tuple) else (n,)
+        shape = (len(self.times),) + shape
+        self.size = 0
+        self.path = path if len(self.times) > 0 else None
+        if self.path is None:
+            self.values = np.zeros(shape, dtype=dtype)
+        else:
+            self.values = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=dtype, shape=shape
+            )
+            snapshot_bytes = self.values[0].nbytes
+            self.chunk = max(CHUNK_BYTES // max(snapshot_bytes, 1), 1)
+
+    def due(self, t):
+        """Whether t is the next snapshot time."""
+        return self.size < len(self.times) and self.times[self.size] == t
+
+    def record(self, t, value):
+        if self.due(t):
+            self.values[self.size] = value
+            self.size += 1
+            if self.path is not None and self.size % self.chunk == 0:
+                self.values.flush()
+
+    def flush(self):
+        """Write the snapshots of an on-disk history to its file."""
+        if self.path is not None:
+            self.values.flush()
+
+    def __getitem__(self, k):
+        return self.values[k]
+
+    def __len__(self):
+        return len(self.times)
+
+
+def history_file(path, name):
+    """File of the history `name` of an estimator, given its path prefix."""
+    return None if path is None else f"{path}_{name}.npy"
+
+
+def history_path(folder, trial, name):
+    """Prefix of the on-disk history files of an estimator in a trial."""
+    return os.path.join(folder, f"trial_{trial}_{name}")
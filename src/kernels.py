@@ -0,0 +1,196 @@
+import numpy as np
+from src.rank import ImprovedBaselineEstimate, BaselineEstimate
+from src.batch import BatchImprovedBaselineEstimate, BatchBaselineEstimate
+
+try:
+    from numba import njit
+
+    NUMBA = True
+except ImportError:
+    NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Without numba, kernels run as plain Python on NumPy arrays."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+@njit(cache=True)
+def _record(t, value, times, values, size):
+    # save value if t is the next snapshot time
+    if size < len(times) and times[size] == t:
+        values[size] = value
+        size += 1
+    return size
+
+
+@njit(cache=True)
+def _track(node, ranking, weight, target, errors, total):
+    # incremental mean absolute error, as in OnlineError.update
+    error = abs(ranking[node] * weight - target[node])
+    total += error - errors[node]
+    errors[node] = error
+    return total
+
+
+@njit(cache=True)
+def improved_baseline_kernel(
+    data,
+    ranking,
+    aux_r,
+    aux_x,
+    pairs,
+    weight,
+    target,
+    errors,
+    total,
+    times,
+    curve,
+    size,
+    history_times,
+    history,
+    history_size,
+):
+    """
+    Baseline++ (ImprovedBaselineEstimate.update) over a whole edge schedule.
+    The state arrays, errors and snapshots are updated in place.
+    """
+    n = len(ranking)
+    for s in range(len(pairs)):
+        t = s + 1
+        i = pairs[s, 0]
+        j = pairs[s, 1]
+        # If auxiliary rankins contradicts auxiliary observations, swap
+        if (aux_x[i] - aux_x[j]) * (aux_r[i] - aux_r[j]) < 0:
+            aux_r[i], aux_r[j] = aux_r[j], aux_r[i]
+
+        # Update local rank with auxiliary rank if there is a contradiction
+        for node in (i, j):
+            predicted_diff = ranking[node] - aux_r[node]
+            truth_diff = data[node] - aux_x[node]
+            if truth_diff * predicted_diff < 0 or truth_diff == 0:
+                ranking[node] = aux_r[node]
+
+        # Swap auxiliary variables
+        aux_r[i], aux_r[j] = aux_r[j], aux_r[i]
+        aux_x[i], aux_x[j] = aux_x[j], aux_x[i]
+
+        total = _track(i, ranking, weight, target, errors, total)
+        total = _track(j, ranking, weight, target, errors, total)
+        size = _record(t, total / n, times, curve, size)
+        history_size = _record(t, ranking, history_times, history, history_size)
+    return total, size, history_size
+
+
+@njit(cache=True)
+def baseline_kernel(
+    data,
+    ranking,
+    aux_r,
+    aux_x,
+    aux_i,
+    pairs,
+    weight,
+    target,
+    errors,
+    total,
+    times,
+    curve,
+    size,
+    history_times,
+    history,
+    history_size,
+):
+    """
+    Baseline (BaselineEstimate.update) over a whole edge schedule.
+    The state arrays, errors and snapshots are updated in place.
+    """
+    n = len(ranking)
+    for s in range(len(pairs)):
+        t = s + 1
+        i = pairs[s, 0]
+        j = pairs[s, 1]
+        # Swap rankings if necessary
+        if (data[i] - data[j]) * (ranking[i] - ranking[j]) < 0:
+            ranking[i], ranking[j] = ranking[j], ranking[i]
+
+        # Swap auxiliary rankings if necessary
+        if (aux_x[i] - aux_x[j]) * (aux_r[i] - aux_r[j]) < 0:
+            aux_r[i], aux_r[j] = aux_r[j], aux_r[i]
+
+        # Swap auxiliary variables
+        aux_i[i], aux_i[j] = aux_i[j], aux_i[i]
+        aux_r[i], aux_r[j] = aux_r[j], aux_r[i]
+        aux_x[i], aux_x[j] = aux_x[j], aux_x[i]
+
+        # Update local ranking estimates
+        for p in (i, j):
+            if aux_i[p] == p:
+                ranking[p] = aux_r[p]
+
+        total = _track(i, ranking, weight, target, errors, total)
+        total = _track(j, ranking, weight, target, errors, total)
+        size = _record(t, total / n, times, curve, size)
+        history_size = _record(t, ranking, history_times, history, history_size)
+    return total, size, history_size
+
+
+# kernel and state arrays of each estimator class
+KERNELS = {
+    ImprovedBaselineEstimate: (improved_baseline_kernel, ["ranking", "aux_r", "aux_x"]),
+    BatchImprovedBaselineEstimate: (
+        improved_baseline_kernel,
+        ["ranking", "aux_r", "aux_x"],
+    ),
+    BaselineEstimate: (baseline_kernel, ["ranking", "aux_r", "aux_x", "aux_i"]),
+    BatchBaselineEstimate: (baseline_kernel, ["ranking", "aux_r", "aux_x", "aux_i"]),
+}
+
+
+def run_compiled(estimate, metric, pairs):
+    """
+    Run a whole edge schedule of an estimate and of its RankError in one
+    compiled loop, giving the same states and curves as stepping them.
+    `pairs` has shape (steps, 2), or (n_trials, steps, 2) for an estimate of
+    the batched engine, whose trials are then run one after the other.
+    """
+    kernel, names = KERNELS[type(estimate)]
+    state = [getattr(estimate, name) for name in names]
+    curve = metric.curve
+    if metric.rows is None:
+        history = estimate.historical_ranking
+        metric.total, curve.size, history.size = kernel(
+            estimate.data,
+            *state,
+            pairs,
+            estimate.weight,
+            metric.target,
+            metric.errors,
+            metric.total,
+            curve.times,
+            curve.values,
+            curve.size,
+            history.times,
+            np.asarray(history.values),
+            history.size,
+        )
+        return
+    no_history = np.zeros((0, estimate.n))
+    for row in metric.rows[:, 0]:
+        metric.total[row], size, _ = kernel(
+            estimate.data[row],
+            *[array[row] for array in state],
+            pairs[row],
+            estimate.weight,
+            metric.target[row],
+            metric.errors[row],
+            metric.total[row],
+            curve.times,
+            curve.values[:, row],
+            curve.size,
+            curve.times[:0],
+            no_history,
+            0,
+        )
+    curve.size = size
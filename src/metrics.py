@@ -0,0 +1,123 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from src.history import History
+
+
+class OnlineError(ABC):
+    """
+    Mean absolute error between the state of an estimate and its target,
+    computed during the simulation and saved in `curve` at the times `times`.
+    When an update only changes nodes i and j (`estimate.local`), the per-node
+    errors and their sum are updated incrementally in O(1). Estimates of the
+    batched engine carry a leading trial axis, and so does the curve; their
+    updates may activate several disjoint edges per trial. With several
+    signals per node, the error is averaged over nodes and signals.
+    """
+
+    # steps by which the curve lags the updates: once step t is run, the
+    # curve is recorded up to step t - lag
+    lag = 0
+
+    def __init__(self, estimate, target, times):
+        self.estimate = estimate
+        self.target = target
+        self.rows = getattr(estimate, "rows", None)
+        # trials lead the node axis in the batched engine, signals follow it
+        self.shape = target.shape[:1] if self.rows is not None else ()
+        self.axes = tuple(range(len(self.shape), target.ndim))
+        self.signals = target.ndim > len(self.shape) + 1
+        # number of errors averaged
+        self.n = int(np.prod([target.shape[axis] for axis in self.axes]))
+        self.local = estimate.local
+        self.curve = History(self.shape, times)
+        if self.local:
+            self.errors = np.abs(self.state() - target)
+            self.total = self.errors.sum(axis=self.axes)
+
+    @abstractmethod
+    def state(self, index=Ellipsis):
+        pass
+
+    def error(self, state=None):
+        """Mean absolute error of the current state, or of `state`."""
+        if self.local and state is None:
+            return self.total / self.n
+        state = self.state() if state is None else state
+        return np.mean(np.abs(state - self.target), axis=self.axes)
+
+    def last_error(self):
+        """Error at the last step recorded in the curve."""
+        return self.error()
+
+    def extend(self, times):
+        """
+        Continue the curve on the evaluation times `times`, whose first
+        times are those of the current curve.
+        """
+        curve = History(self.shape, times)
+        curve.values[: len(self.curve.times)] = self.curve.values
+        curve.size = self.curve.size
+        self.curve = curve
+
+    def record(self, t, state=None):
+        if self.curve.due(t):
+            self.curve.record(t, self.error(state))
+
+    def update(self, t, i, j):
+        if self.local:
+            for node in [i, j]:
+                if self.rows is None:
+                    error = np.abs(self.state(node) - self.target[node])
+                    change = error - self.errors[node]
+                    self.total += change.sum() if self.signals else change
+                    self.errors[node] = error
+                else:
+                    # nodes of shape (n_trials, k)
+                    index = (self.rows, node)
+                    error = np.abs(self.state(index) - self.target[index])
+                    self.total += (error - self.errors[index]).sum(axis=self.axes)
+                    self.errors[index] = error
+        self.record(t)
+
+
+class RankError(OnlineError):
+    """Error of the normalized rank estimates of a RankEstimate."""
+
+    def __init__(self, estimate, true_ranks, times):
+        super().__init__(estimate, true_ranks / estimate.n, times)
+        self.record(0)
+
+    def state(self, index=Ellipsis):
+        return self.estimate.ranking[index] * self.estimate.weight
+
+
+class MeanError(OnlineError):
+    """Error of the estimates z of a gossip averaging algorithm."""
+
+    def __init__(self, estimate, true_value, times):
+        super().__init__(estimate, true_value, times)
+        self.record(0)
+
+    def state(self, index=Ellipsis):
+        return self.estimate.z[index]
+
+
+class TrimError(MeanError):
+    """
+    Error of the estimates z of a MeanEstimate. The correction of step t is
+    applied to the estimate of step t - 1, which is thus evaluated one step
+    late, from `z_prev`.
+    """
+
+    lag = 1
+
+    def __init__(self, estimate, true_value, times):
+        OnlineError.__init__(self, estimate, true_value, times)
+
+    def last_error(self):
+        return self.error(self.estimate.z_prev)
+
+    def update(self, t, i, j):
+        self.record(t - 1, self.estimate.z_prev)
+        if t == self.estimate.horizon - 1:
+            self.record(t)
@@ -0,0 +1,163 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# peak traced memory of the phases open in this process, innermost last
+_open = []
+
+
+class Profile:
+    """
+    Instrumentation of an experiment run: wall time, and with `memory` the
+    peak memory traced by tracemalloc, of named phases; with `estimators`,
+    the cumulative time of the updates of each estimator and of its error
+    metric; and the number of steps run, reported in steps per second every
+    `every` seconds. Profiles of the blocks run by worker processes are
+    merged into the profile of the run.
+    """
+
+    def __init__(self, memory=False, estimators=False, every=60):
+        self.memory = memory
+        self.estimators = estimators
+        self.every = every
+        self.phases = {}
+        self.updates = {}
+        self.steps = 0
+        self.reported = 0
+        self.start = self.last = time.perf_counter()
+        self.running = {}
+
+    def begin(self, name):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # the peak of the enclosing phase is kept before the reset
+            if _open:
+                _open[-1] = max(_open[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            _open.append(0)
+        self.running[name] = time.perf_counter()
+
+    def end(self, name):
+        seconds = time.perf_counter() - self.running.pop(name)
+        phase = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+        phase["seconds"] += seconds
+        phase["calls"] += 1
+        if self.memory:
+            peak = max(_open.pop(), tracemalloc.get_traced_memory()[1])
+            if _open:
+                _open[-1] = max(_open[-1], peak)
+            phase["peak_memory_mb"] = max(phase.get("peak_memory_mb", 0), peak / 2**20)
+
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def timed(self, name, function):
+        """`function` run as the phase `name`."""
+
+        def run(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+
+        return run
+
+    def add_update(self, name, seconds, metric_seconds):
+        update = self.updates.setdefault(
+            name, {"seconds": 0.0, "metric_seconds": 0.0, "steps": 0}
+        )
+        update["seconds"] += seconds
+        update["metric_seconds"] += metric_seconds
+        update["steps"] += 1
+
+    def progress(self, steps):
+        """
+        Count `steps` steps, and report every `every` seconds the rate of the
+        steps since the last report (or since the first step).
+        """
+        now = time.perf_counter()
+        if self.steps == 0:
+            self.last = now
+        self.steps += steps
+        if now - self.last >= self.every:
+            rate = (self.steps - self.reported) / (now - self.last)
+            print(f"{self.steps} steps, {rate:.0f} steps/s")
+            self.last = now
+            self.reported = self.steps
+
+    def merge(self, other):
+        """Add the phases, updates and steps of another profile."""
+        for name, phase in other.phases.items():
+            total = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            total["seconds"] += phase["seconds"]
+            total["calls"] += phase["calls"]
+            if "peak_memory_mb" in phase:
+                total["peak_memory_mb"] = max(
+                    total.get("peak_memory_mb", 0), phase["peak_memory_mb"]
+                )
+        for name, update in other.updates.items():
+            total = self.updates.setdefault(
+                name, {"seconds": 0.0, "metric_seconds": 0.0, "steps": 0}
+            )
+            for key in total:
+                total[key] += update[key]
+        self.steps += other.steps
+
+    def report(self):
+        return {
+            "seconds": time.perf_counter() - self.start,
+            "steps": self.steps,
+            "phases": self.phases,
+            "estimators": self.updates,
+        }
+
+
+def start_profiler(kind):
+    """
+    Start a cProfile or pyinstrument profiler of the main process, or
+    nothing when `kind` is None.
+    """
+    if kind is None:
+        return None
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        except ImportError:
+            print("pyinstrument is not installed, profiling with cProfile.")
+    elif kind != "cprofile":
+        raise ValueError("Wrong profiler.")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler, folder):
+    """
+    Stop a profiler and save its output to `folder`, as profile.prof
+    (cProfile, e.g. for snakeviz) or profile.html (pyinstrument).
+    """
+    if profiler is None:
+        return
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        profiler.dump_stats(os.path.join(folder, "profile.prof"))
+    else:
+        profiler.stop()
+        with open(os.path.join(folder, "profile.html"), "w") as f:
+            f.write(profiler.output_html())
+
+
+def save_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
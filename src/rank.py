@@ -1,44 +1,80 @@
 import numpy as np
 from abc import ABC, abstractmethod
+from src.history import History, history_file
+from src.utils import PRECISIONS
 
 
 class RankEstimate(ABC):
     """
     Abstract class for ranking estimates.
+    Only the current state is kept; the rank estimates are saved in
+    `historical_ranking` at the snapshot times `times` (every step by default),
+    in the file `<path>_ranking.npy` when a path prefix is given.
+    `local` tells whether an update only changes the estimates of nodes i, j.
+    `precision` selects the dtypes of the states (see src.utils.PRECISIONS).
+    Estimates that support it rank several signals at once: `data` of shape
+    (n, d) holds d values per node, and their states have the same shape.
     """
 
-    def __init__(self, horizon, n, data):
+    def __init__(self, horizon, n, data, times=None, path=None, precision="double"):
         self.horizon = horizon
         self.n = n
         self.data = data.copy()
-        self.historical_ranking = np.zeros((horizon, n))
+        self.times = np.arange(horizon) if times is None else times
+        self.dtypes = PRECISIONS[precision]
+        self.historical_ranking = History(
+            data.shape, self.times, history_file(path, "ranking"), self.dtypes["value"]
+        )
         self.name = "Ranking"
 
     @abstractmethod
     def update(self, t, i, j):
         pass
 
+    def record(self, t):
+        if self.historical_ranking.due(t):
+            self.historical_ranking.record(t, self.ranking)
+
 
 class GoRankEstimate(RankEstimate):
     """
-    This class implements the GoRank algorithm
+    This class implements the GoRank algorithm.
+    Each node keeps the number of comparisons its auxiliary observation has won
+    up to the time of its last change. Since a swap only changes the auxiliary
+    observations of nodes i and j, an update costs O(1) and the average of the
+    other nodes is brought up to date only when it is read. With (n, d) data,
+    a swap moves the d auxiliary observations of a node at once.
     """
 
-    def __init__(self, horizon, n, data):
-        super().__init__(horizon, n, data)
+    def __init__(self, horizon, n, data, times=None, path=None, precision="double"):
+        super().__init__(horizon, n, data, times, path, precision)
         self.y_data = data.copy()
+        self.count = np.zeros(data.shape, dtype=self.dtypes["count"])
+        self.last = np.zeros(data.shape, dtype=self.dtypes["count"])
+        self.above = np.zeros(data.shape, dtype=bool)
+        self.t = 0
         self.weight = 1
         self.color = "C1"
         self.name = "GoRank (ours)"
         self.marker = "C1o-"
+        self.local = False
+        self.record(0)
+
+    @property
+    def ranking(self):
+        """Rank estimates of all nodes at the current time step."""
+        return (self.count + self.above * (self.t - self.last)) / max(self.t, 1)
 
     def update(self, t, i, j):
-        # Update auxiliary rank estimates
-        self.historical_ranking[t] = (t - 1) * self.historical_ranking[t - 1]
-        self.historical_ranking[t] += self.data > self.y_data
-        self.historical_ranking[t] /= t
+        # Bring the comparison counts of nodes i and j up to time t
+        for node in [i, j]:
+            self.count[node] += self.above[node] * (t - self.last[node])
+            self.last[node] = t
         # Swap auxiliary observations
         self.y_data[[i, j]] = self.y_data[[j, i]]
+        self.above[[i, j]] = self.data[[i, j]] > self.y_data[[i, j]]
+        self.t = t
+        self.record(t)
 
 
 class GoRankEstimateAsync(RankEstimate):
@@ -46,27 +82,30 @@ class GoRankEstimateAsync(RankEstimate):
     This class implements the GoRank algorithm
     """
 
-    def __init__(self, horizon, n, data):
-        super().__init__(horizon, n, data)
+    def __init__(self, horizon, n, data, times=None, path=None, precision="double"):
+        super().__init__(horizon, n, data, times, path, precision)
         self.y_data = data.copy()
         self.weight = 1
         self.color = "C1"
         self.name = "GoRank Async (ours)"
         self.marker = "C1o-"
-        self.count = np.zeros(n)
+        self.local = True
+        self.ranking = np.zeros(data.shape, dtype=self.dtypes["value"])
+        self.count = np.zeros(n, dtype=self.dtypes["count"])
+        self.record(0)
 
     def update(self, t, i, j):
         # Update auxiliary rank estimates
-        self.historical_ranking[t] = self.historical_ranking[t - 1].copy()
         self.count[i] += 1
         self.count[j] += 1
         for node in [i, j]:
-            self.historical_ranking[t][node] = (
-                (self.count[node] - 1) * self.historical_ranking[t - 1][node]
+            self.ranking[node] = (
+                (self.count[node] - 1) * self.ranking[node]
                 + (self.data[node] > self.y_data[node])
             ) / self.count[node]
         # Swap auxiliary observations
         self.y_data[[i, j]] = self.y_data[[j, i]]
+        self.record(t)
 
 
 class ImprovedBaselineEstimate(RankEstimate):
@@ -74,51 +113,37 @@ class ImprovedBaselineEstimate(RankEstimate):
     This class implements the Baseline++ algorithm
     """
 
-    def __init__(self, horizon, n, data):
-        super().__init__(horizon, n, data)
-        self.historical_aux_r = np.zeros((horizon, n))
-        self.historical_aux_x = np.zeros((horizon, n))
-        self.historical_ranking[0] = np.arange(n)
-        self.historical_aux_r[0] = np.arange(n)
-        self.historical_aux_x[0] = data.copy()
+    def __init__(self, horizon, n, data, times=None, path=None, precision="double"):
+        super().__init__(horizon, n, data, times, path, precision)
+        self.ranking = np.arange(n, dtype=self.dtypes["rank"])
+        self.aux_r = np.arange(n, dtype=self.dtypes["rank"])
+        self.aux_x = data.astype(float)
         self.weight = 1 / n
         self.color = "b"
         self.name = "Baseline++ (ours)"
+        self.local = True
+        self.record(0)
 
     def update(self, t, i, j):
-        self.historical_ranking[t] = self.historical_ranking[t - 1].copy()
-        self.historical_aux_r[t] = self.historical_aux_r[t - 1].copy()
-        self.historical_aux_x[t] = self.historical_aux_x[t - 1].copy()
-
         # If auxiliary rankins contradicts auxiliary observations, swap
-        predicted_diff = self.historical_aux_r[t][i] - self.historical_aux_r[t][j]
-        truth_diff = self.historical_aux_x[t][i] - self.historical_aux_x[t][j]
+        predicted_diff = self.aux_r[i] - self.aux_r[j]
+        truth_diff = self.aux_x[i] - self.aux_x[j]
         if truth_diff * predicted_diff < 0:
-            self.historical_aux_r[t][i], self.historical_aux_r[t][j] = (
-                self.historical_aux_r[t - 1][j],
-                self.historical_aux_r[t - 1][i],
-            )
+            self.aux_r[i], self.aux_r[j] = self.aux_r[j], self.aux_r[i]
 
         # Update local rank with auxiliary rank if there is a contradiction
         for node in [i, j]:
-            predicted_diff = (
-                self.historical_ranking[t][node] - self.historical_aux_r[t][node]
-            )
-            truth_diff = self.data[node] - self.historical_aux_x[t][node]
+            predicted_diff = self.ranking[node] - self.aux_r[node]
+            truth_diff = self.data[node] - self.aux_x[node]
 
             # Update local rank
             if truth_diff * predicted_diff < 0 or truth_diff == 0:
-                self.historical_ranking[t][node] = self.historical_aux_r[t][node]
+                self.ranking[node] = self.aux_r[node]
 
         # Swap auxiliary variables
-        self.historical_aux_r[t][i], self.historical_aux_r[t][j] = (
-            self.historical_aux_r[t][j],
-            self.historical_aux_r[t][i],
-        )
-        self.historical_aux_x[t][i], self.historical_aux_x[t][j] = (
-            self.historical_aux_x[t][j],
-            self.historical_aux_x[t][i],
-        )
+        self.aux_r[i], self.aux_r[j] = self.aux_r[j], self.aux_r[i]
+        self.aux_x[i], self.aux_x[j] = self.aux_x[j], self.aux_x[i]
+        self.record(t)
 
 
 class BaselineEstimate(RankEstimate):
@@ -126,58 +151,34 @@ class BaselineEstimate(RankEstimate):
     This class implements the Baseline++ algorithm
     """
 
-    def __init__(self, horizon, n, data):
-        super().__init__(horizon, n, data)
-        self.historical_aux_r = np.zeros((horizon, n))
-        self.historical_aux_x = np.zeros((horizon, n))
-        self.historical_aux_i = np.zeros((horizon, n))
-        self.historical_ranking[0] = np.arange(n)
-        self.historical_aux_r[0] = np.arange(n)
-        self.historical_aux_x[0] = data.copy()
-        self.historical_aux_i[0] = range(n)
+    def __init__(self, horizon, n, data, times=None, path=None, precision="double"):
+        super().__init__(horizon, n, data, times, path, precision)
+        self.ranking = np.arange(n, dtype=self.dtypes["rank"])
+        self.aux_r = np.arange(n, dtype=self.dtypes["rank"])
+        self.aux_x = data.astype(float)
+        self.aux_i = np.arange(n, dtype=self.dtypes["index"])
         self.weight = 1 / n
         self.color = "green"
         self.name = "Baseline (Chiuso et al.)"
+        self.local = True
+        self.record(0)
 
     def update(self, t, i, j):
-        self.historical_ranking[t] = self.historical_ranking[t - 1].copy()
-        self.historical_aux_r[t] = self.historical_aux_r[t - 1].copy()
-        self.historical_aux_x[t] = self.historical_aux_x[t - 1].copy()
-        self.historical_aux_i[t] = self.historical_aux_i[t - 1].copy()
-
         # Swap rankings if necessary
-        if (self.data[i] - self.data[j]) * (
-            self.historical_ranking[t - 1][i] - self.historical_ranking[t - 1][j]
-        ) < 0:
-            self.historical_ranking[t][i], self.historical_ranking[t][j] = (
-                self.historical_ranking[t - 1][j],
-                self.historical_ranking[t - 1][i],
-            )
+        if (self.data[i] - self.data[j]) * (self.ranking[i] - self.ranking[j]) < 0:
+            self.ranking[i], self.ranking[j] = self.ranking[j], self.ranking[i]
 
         # Swap auxiliary rankings if necessary
-        if (self.historical_aux_x[t - 1][i] - self.historical_aux_x[t - 1][j]) * (
-            self.historical_aux_r[t - 1][i] - self.historical_aux_r[t - 1][j]
-        ) < 0:
-            self.historical_aux_r[t][i], self.historical_aux_r[t][j] = (
-                self.historical_aux_r[t - 1][j],
-                self.historical_aux_r[t - 1][i],
-            )
+        if (self.aux_x[i] - self.aux_x[j]) * (self.aux_r[i] - self.aux_r[j]) < 0:
+            self.aux_r[i], self.aux_r[j] = self.aux_r[j], self.aux_r[i]
 
         # Swap auxiliary variables
-        self.historical_aux_i[t][i], self.historical_aux_i[t][j] = (
-            self.historical_aux_i[t][j],
-            self.historical_aux_i[t][i],
-        )
-        self.historical_aux_r[t][i], self.historical_aux_r[t][j] = (
-            self.historical_aux_r[t][j],
-            self.historical_aux_r[t][i],
-        )
-        self.historical_aux_x[t][i], self.historical_aux_x[t][j] = (
-            self.historical_aux_x[t][j],
-            self.historical_aux_x[t][i],
-        )
+        self.aux_i[i], self.aux_i[j] = self.aux_i[j], self.aux_i[i]
+        self.aux_r[i], self.aux_r[j] = self.aux_r[j], self.aux_r[i]
+        self.aux_x[i], self.aux_x[j] = self.aux_x[j], self.aux_x[i]
 
         # Update local ranking estimates
         for p in [i, j]:
-            if self.historical_aux_i[t][p] == p:
-                self.historical_ranking[t][p] = self.historical_aux_r[t][p]
+            if self.aux_i[p] == p:
+                self.ranking[p] = self.aux_r[p]
+        self.record(t)
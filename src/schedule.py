@@ -0,0 +1,156 @@
+import numpy as np
+import os
+
+
+class EdgeSchedule:
+    """
+    Edges activated at each step of a trial, stored as an int32 array of
+    shape (steps, 2); row t - 1 holds the edge (i, j) of step t.
+    All estimators of a trial consume the same schedule.
+    """
+
+    def __init__(self, pairs):
+        self.pairs = np.asarray(pairs, dtype=np.int32)
+
+    @classmethod
+    def sample(cls, edges, steps, rng):
+        """Draw `steps` edges uniformly at random with a np.random.Generator."""
+        edges = np.asarray(edges, dtype=np.int32)
+        return cls(edges[rng.integers(len(edges), size=steps)])
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path))
+
+    def save(self, path):
+        np.save(path, self.pairs)
+
+    def __len__(self):
+        return len(self.pairs)
+
+
+class PoissonSchedule(EdgeSchedule):
+    """
+    Edges activated by independent exponential clocks, one per edge, with
+    the continuous times of the activations: row t - 1 of `pairs` is the
+    edge of the t-th event, which happens at time `times[t - 1]`.
+    """
+
+    def __init__(self, pairs, times):
+        super().__init__(pairs)
+        self.times = np.asarray(times, dtype=float)
+
+    @classmethod
+    def sample(cls, edges, rates, steps, rng):
+        """
+        Draw the first `steps` events of clocks of the given rates, at once:
+        their superposition is a Poisson process of rate rates.sum() whose
+        events activate edge e with probability rates[e] / rates.sum().
+        """
+        edges = np.asarray(edges, dtype=np.int32)
+        total = rates.sum()
+        pairs = edges[rng.choice(len(edges), size=steps, p=rates / total)]
+        times = np.cumsum(rng.exponential(1 / total, size=steps))
+        return cls(pairs, times)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as schedule:
+            return cls(schedule["pairs"], schedule["times"])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(f, pairs=self.pairs, times=self.times)
+
+    def elapsed(self, steps):
+        """Continuous time elapsed after the given numbers of steps."""
+        return np.concatenate([[0], self.times])[steps]
+
+
+def clock_rates(size, slow_fraction=0, slow_rate=1, rng=None):
+    """
+    Rates of `size` clocks: a random fraction `slow_fraction` of them tick
+    at rate `slow_rate`, e.g. slow sensors, and the others at rate 1.
+    """
+    rates = np.ones(size)
+    n_slow = int(slow_fraction * size)
+    if n_slow > 0:
+        rates[rng.choice(size, n_slow, replace=False)] = slow_rate
+    return rates
+
+
+def edge_rates(graph, node_rates):
+    """
+    Rates of the edges of a src.graph.Graph when node i wakes up at rate
+    node_rates[i] and contacts a neighbor chosen uniformly at random: edge
+    (u, v) is activated at rate node_rates[u] / deg(u) + node_rates[v] / deg(v).
+    """
+    per_neighbor = node_rates / np.maximum(graph.degree, 1)
+    return per_neighbor[graph.edges[:, 0]] + per_neighbor[graph.edges[:, 1]]
+
+
+def random_matching(edges, n, rng):
+    """
+    Random maximal matching of a graph with the given int32 edges, built by
+    Luby-style rounds: each remaining edge draws a random priority and is
+    matched when its priority is the smallest among the remaining edges of
+    both its nodes, then the edges of the matched nodes are removed.
+    """
+    matched = []
+    while len(edges) > 0:
+        priority = rng.random(len(edges))
+        best = np.full(n, np.inf)
+        np.minimum.at(best, edges[:, 0], priority)
+        np.minimum.at(best, edges[:, 1], priority)
+        keep = (priority == best[edges[:, 0]]) & (priority == best[edges[:, 1]])
+        matched.append(edges[keep])
+        covered = np.zeros(n, dtype=bool)
+        covered[edges[keep].ravel()] = True
+        edges = edges[~covered[edges[:, 0]] & ~covered[edges[:, 1]]]
+    return np.concatenate(matched) if matched else np.zeros((0, 2), dtype=np.int32)
+
+
+class MatchingSchedule:
+    """
+    Random matchings activated at each round of a trial, stored as the
+    concatenation `pairs` of their edges (an int32 array of shape
+    (activations, 2)) and the offsets of the rounds: the matching of round t
+    is pairs[offsets[t - 1]:offsets[t]].
+    """
+
+    def __init__(self, pairs, offsets):
+        self.pairs = np.asarray(pairs, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def sample(cls, graph, rounds, rng):
+        """Draw `rounds` random maximal matchings of a src.graph.Graph."""
+        matchings = [random_matching(graph.edges, graph.n, rng) for _ in range(rounds)]
+        sizes = [len(matching) for matching in matchings]
+        return cls(np.concatenate(matchings), np.concatenate([[0], np.cumsum(sizes)]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as schedule:
+            return cls(schedule["pairs"], schedule["offsets"])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(f, pairs=self.pairs, offsets=self.offsets)
+
+    def activations(self, rounds):
+        """Number of edges activated after the given numbers of rounds."""
+        return self.offsets[rounds]
+
+    def matching(self, t):
+        """Edges (i, j) of the matching of round t, as two int arrays."""
+        pairs = self.pairs[self.offsets[t - 1] : self.offsets[t]]
+        return pairs[:, 0], pairs[:, 1]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def schedule_path(folder, trial, ext="npy"):
+    """Path of the saved schedule of a trial."""
+    return os.path.join(folder, f"trial_{trial}.{ext}")
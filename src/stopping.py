@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class EarlyStopping:
+    """
+    Opt-in stopping rule of the error of an OnlineError metric, checked
+    every `every` steps. A trial stops once its error is at most `target`,
+    or once its error improved by less than a fraction `tol` over the last
+    `window` steps. Stop times, and the errors at these times, are kept per
+    trial for metrics of the batched engine.
+    """
+
+    def __init__(self, metric, every=1000, target=None, window=None, tol=0.01):
+        self.metric = metric
+        self.every = every
+        self.target = target
+        self.tol = tol
+        # number of checks in a window
+        self.lag = max(window // every, 1) if window else 0
+        self.past = []
+        shape = metric.shape
+        self.stop = np.full(shape, -1)
+        self.final = np.zeros(shape)
+        self.newly = np.zeros(shape, dtype=bool)
+
+    def check(self, t):
+        """
+        Check the rule at step t. `newly` then tells which trials stopped at
+        t; returns whether all trials have stopped.
+        """
+        # error of the last step in the curve, step t - 1 for GoTrim
+        error = self.metric.last_error()
+        stop = np.zeros(error.shape, dtype=bool)
+        if self.target is not None:
+            stop |= error <= self.target
+        if self.lag:
+            self.past.append(error)
+            if len(self.past) > self.lag:
+                before = self.past.pop(0)
+                stop |= before - error <= self.tol * before
+        self.newly = stop & (self.stop < 0)
+        self.stop = np.where(self.newly, t, self.stop)
+        self.final = np.where(self.newly, error, self.final)
+        return bool(np.all(self.stop >= 0))
+
+    def finish(self, horizon):
+        """
+        Pad the error curve of the stopped trials, after the last step it
+        recorded, with their error at the stop time, and set the stop time
+        of the other trials to the last step.
+        """
+        curve = self.metric.curve
+        stopped = self.stop >= 0
+        times = curve.times.reshape((-1,) + (1,) * self.stop.ndim)
+        pad = stopped & (times > self.stop - self.metric.lag)
+        curve.values[:] = np.where(pad, self.final, curve.values)
+        curve.size = len(curve.times)
+        self.stop = np.where(stopped, self.stop, horizon - 1)
@@ -0,0 +1,168 @@
+import json
+import numpy as np
+import os
+import pickle
+from omegaconf import OmegaConf
+
+# results saved as curves over the evaluation times, stored in chunks
+CURVES = [
+    "timesteps",
+    "activations",
+    "clock",
+    "mean_relative_error",
+    "std_relative_error",
+    "min_relative_error",
+    "max_relative_error",
+]
+# points of a curve per compressed chunk
+CHUNK = 2**16
+
+
+def store_path(path):
+    """Path of the results store replacing the pickle `path`, e.g. results.pkl."""
+    return os.path.splitext(path)[0] + ".npz"
+
+
+def save_results(path, results, chunk=CHUNK):
+    """
+    Save the results of an experiment to a compressed .npz store. Each array
+    is a separate member, read only when accessed: the arrays of each
+    estimator are stored under "<key>/<index of the estimator>", and curves
+    are split in chunks of `chunk` points, "<key>/<index>/<chunk>". A small
+    JSON header "meta" holds the config, the estimator names, the scalar
+    results and the layout of the store.
+    """
+    names = list(results["names"])
+    meta = {"names": names, "chunk": chunk, "arrays": {}, "scalars": {}}
+    arrays = {}
+
+    def add(key, value, curve):
+        value = np.asarray(value)
+        if not curve:
+            arrays[key] = value
+            return len(value)
+        for k, start in enumerate(range(0, max(len(value), 1), chunk)):
+            arrays[f"{key}/{k}"] = value[start : start + chunk]
+        return len(value)
+
+    for key, value in results.items():
+        if key in ["names", "config"]:
+            continue
+        curve = key in CURVES
+        if isinstance(value, dict):
+            if all(np.ndim(value[name]) == 0 for name in value):
+                meta["scalars"][key] = {name: float(value[name]) for name in value}
+                continue
+            lengths = [
+                add(f"{key}/{names.index(name)}", value[name], curve) for name in names
+            ]
+            meta["arrays"][key] = {"per_name": True, "curve": curve, "len": lengths}
+        else:
+            length = add(key, value, curve)
+            meta["arrays"][key] = {"per_name": False, "curve": curve, "len": length}
+    config = results.get("config")
+    if config is not None:
+        meta["config"] = OmegaConf.to_container(config, resolve=True)
+    arrays["meta"] = np.array(json.dumps(meta))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+
+
+class ResultStore:
+    """
+    Lazy reader of a results store written by save_results. Arrays are only
+    read (and decompressed) when accessed, and only the chunks covering the
+    requested points of a curve are read.
+    """
+
+    def __init__(self, path):
+        self.file = np.load(path)
+        self.meta = json.loads(str(self.file["meta"]))
+        self.names = self.meta["names"]
+        self.chunk = self.meta["chunk"]
+
+    def __contains__(self, key):
+        return key in self.meta["arrays"] or key in self.meta["scalars"]
+
+    def _key(self, key, name):
+        layout = self.meta["arrays"][key]
+        if not layout["per_name"]:
+            return key, layout["len"]
+        index = self.names.index(name)
+        return f"{key}/{index}", layout["len"][index]
+
+    def get(self, key, name=None, start=0, stop=None):
+        """
+        Array `key` of the estimator `name` (or of the experiment when name
+        is None), restricted to the points start:stop for curves.
+        """
+        if key in self.meta["scalars"]:
+            return self.meta["scalars"][key][name]
+        member, length = self._key(key, name)
+        if not self.meta["arrays"][key]["curve"]:
+            return self.file[member]
+        stop = length if stop is None else min(stop, length)
+        chunks = range(start // self.chunk, max((stop - 1) // self.chunk + 1, 1))
+        values = np.concatenate([self.file[f"{member}/{k}"] for k in chunks])
+        offset = chunks[0] * self.chunk
+        return values[start - offset : stop - offset]
+
+    def to_dict(self):
+        """All results, in the layout of the pickled results dict."""
+        results = {"names": self.names, "config": self.meta.get("config")}
+        for key, layout in self.meta["arrays"].items():
+            if layout["per_name"]:
+                results[key] = {name: self.get(key, name) for name in self.names}
+            else:
+                results[key] = self.get(key)
+        results.update(self.meta["scalars"])
+        return results
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LegacyResults:
+    """Pickled results dict behind the interface of a ResultStore."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.results = pickle.load(f)
+        self.names = self.results["names"]
+
+    def __contains__(self, key):
+        return key in self.results
+
+    def get(self, key, name=None, start=0, stop=None):
+        value = self.results[key] if name is None else self.results[key][name]
+        return value[start:stop] if key in CURVES else value
+
+    def to_dict(self):
+        return self.results
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_results(path):
+    """
+    Results of an experiment saved to `path` (e.g. results.pkl), read from
+    its store when there is one, else from the pickle.
+    """
+    if os.path.exists(store_path(path)):
+        return ResultStore(store_path(path))
+    return LegacyResults(path)
@@ -1,50 +1,82 @@
 import numpy as np
 from abc import ABC
-from src.utils import wn
+from src.utils import wn, PRECISIONS
+from src.history import History, history_file, snapshot_times
 
 
 class MeanEstimate(ABC):
-    def __init__(self, horizon, n, data, alpha, rank_class):
+    def __init__(
+        self,
+        horizon,
+        n,
+        data,
+        alpha,
+        rank_class,
+        times=None,
+        path=None,
+        precision="double",
+    ):
         self.horizon = horizon
         self.n = n
         self.alpha = alpha
-        self.data = data.copy()
-        self.historical_z = np.zeros((horizon, n))
-        self.historical_avg = np.zeros((horizon, n))
-        self.historical_w = np.zeros((horizon, n))
-        self.rank = rank_class(horizon, n, data)
+        self.value = PRECISIONS[precision]["value"]
+        self.data = data.astype(self.value)
+        self.times = np.arange(horizon) if times is None else times
+        self.z = np.zeros(data.shape, dtype=self.value)
+        self.z_prev = self.z
+        self.w = np.zeros(data.shape, dtype=self.value)
+        shape = data.shape
+        self.historical_z = History(
+            shape, self.times, history_file(path, "z"), self.value
+        )
+        self.historical_w = History(
+            shape, self.times, history_file(path, "w"), self.value
+        )
+        self.historical_w.record(0, self.w)
+        self.rank = rank_class(
+            horizon, n, data, snapshot_times(horizon, "none"), precision=precision
+        )
         self.weight = self.rank.weight * n
         self.name = "GoTrim + " + self.rank.name
+        self.local = False
 
     def update_mean(self, t, i, j):
         # update dynamic weights
-        self.historical_w[t] = self.n * wn(
-            self.n, self.weight * self.rank.historical_ranking[t] + 1, self.alpha
-        )
+        w = self.n * wn(self.n, self.weight * self.rank.ranking + 1, self.alpha)
+        w = w.astype(self.value, copy=False)
+        self.historical_w.record(t, w)
 
-        # update z estimate of all nodes
-        delta = self.historical_w[t] - self.historical_w[t - 1]
-        self.historical_z[t - 1] = self.historical_z[t - 1] + delta * self.data
+        # update z estimate of all nodes, the correction of step t is
+        # recorded as the estimate of step t - 1
+        self.z_prev = self.z + (w - self.w) * self.data
+        self.w = w
+        self.historical_z.record(t - 1, self.z_prev)
 
         # update z estimate for nodes i, j
-        self.historical_z[t] = self.historical_z[t - 1].copy()
-        self.historical_z[t][i] = (
-            self.historical_z[t - 1][i] + self.historical_z[t - 1][j]
-        ) / 2
-        self.historical_z[t][j] = (
-            self.historical_z[t - 1][i] + self.historical_z[t - 1][j]
-        ) / 2
+        self.z = self.z_prev.copy()
+        self.z[i] = self.z[j] = (self.z_prev[i] + self.z_prev[j]) / 2
+        if t == self.horizon - 1:
+            self.historical_z.record(t, self.z)
 
 
 class ClippedGossip(ABC):
-    def __init__(self, horizon, n, data, tau):
+    def __init__(
+        self, horizon, n, data, tau, times=None, path=None, precision="double"
+    ):
         self.horizon = horizon
         self.n = n
         self.tau = tau
         self.data = data.copy()
-        self.historical_z = np.zeros((horizon, n))
-        self.historical_z[0] = data.copy()
+        self.times = np.arange(horizon) if times is None else times
+        self.value = PRECISIONS[precision]["value"]
+        self.z = data.astype(self.value)
+        shape = data.shape
+        self.historical_z = History(
+            shape, self.times, history_file(path, "z"), self.value
+        )
+        self.historical_z.record(0, self.z)
         self.name = "Clipped Gossip (He et al.)"
+        self.local = True
 
     def clip(self, z, tau):
         norm = np.linalg.norm(z)
@@ -52,12 +84,13 @@ class ClippedGossip(ABC):
         return factor * z
 
     def update_mean(self, t, i, j):
-        xi_prev = self.historical_z[t - 1][i]
-        xj_prev = self.historical_z[t - 1][j]
+        xi_prev = self.z[i]
+        xj_prev = self.z[j]
 
+        # with (n, d) data, the difference of the d signals is clipped in norm
         delta = xj_prev - xi_prev
         clipped_delta = self.clip(delta, self.tau)
 
-        self.historical_z[t] = self.historical_z[t - 1].copy()
-        self.historical_z[t][i] = xi_prev + 0.5 * clipped_delta
-        self.historical_z[t][j] = xj_prev - 0.5 * clipped_delta
+        self.z[i] = xi_prev + 0.5 * clipped_delta
+        self.z[j] = xj_prev - 0.5 * clipped_delta
+        self.historical_z.record(t, self.z)
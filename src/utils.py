@@ -1,5 +1,22 @@
 import numpy as np
 import networkx as nx
+import warnings
+from scipy.sparse import diags
+from scipy.sparse.linalg import eigsh, lobpcg
+from src.graph import Graph
+
+# dtypes of estimator states: node indices, integer ranks, counters and real
+# values. "double" keeps everything in 64 bits, "compact" halves the memory
+# and bandwidth of the states.
+PRECISIONS = {
+    "double": {"index": float, "rank": float, "count": int, "value": float},
+    "compact": {
+        "index": np.int32,
+        "rank": np.int32,
+        "count": np.int32,
+        "value": np.float32,
+    },
+}
 
 
 def wn(n, r, alpha=0.1):
@@ -12,10 +29,64 @@ def wn(n, r, alpha=0.1):
     return weights
 
 
-def compute_connectivity(graph):
-    """Compute lambda_2/|E| for a given graph."""
+def fiedler_value(laplacian, maxiter=1000, rtol=1e-4, restarts=3, shift_invert=20000):
+    """
+    Second smallest eigenvalue of a sparse graph Laplacian.
+    LOBPCG, with a Jacobi preconditioner and orthogonally to the constant
+    eigenvector, converges in a few hundred iterations on well connected
+    graphs. The eigenvalue is accepted when the residual of its unit
+    eigenvector, which bounds its absolute error, is below `rtol` times the
+    eigenvalue; otherwise LOBPCG is restarted from its last iterate with
+    twice as many iterations. If it still has not converged (e.g. on grids),
+    Lanczos iterations are run in shift-invert mode around a small negative
+    shift, for which the shifted Laplacian is positive definite, on graphs of
+    at most `shift_invert` nodes, since the fill-in of its factorization
+    grows quickly with the size of the graph. On larger graphs, the last
+    LOBPCG estimate is returned with a warning.
+    """
+    n = laplacian.shape[0]
+    x = np.random.default_rng(0).standard_normal((n, 1))
+    preconditioner = diags(1 / np.maximum(laplacian.diagonal(), 1))
+    for restart in range(restarts + 1):
+        with warnings.catch_warnings():
+            # convergence is checked below
+            warnings.simplefilter("ignore")
+            eigenvalues, x = lobpcg(
+                laplacian,
+                x,
+                M=preconditioner,
+                Y=np.ones((n, 1)),
+                largest=False,
+                tol=1e-9,
+                maxiter=maxiter * 2**restart,
+            )
+        residual = np.linalg.norm(laplacian @ x - eigenvalues * x) / np.linalg.norm(x)
+        if residual <= rtol * eigenvalues[0]:
+            return eigenvalues[0]
+    if n <= shift_invert:
+        eigenvalues = eigsh(
+            laplacian.tocsc(), k=2, sigma=-1e-6, which="LM", return_eigenvectors=False
+        )
+        return np.sort(eigenvalues)[1]
+    warnings.warn(
+        f"LOBPCG did not converge: lambda_2 = {eigenvalues[0]:.3e} "
+        f"up to {residual:.1e}."
+    )
+    return eigenvalues[0]
+
+
+def compute_connectivity(graph, threshold=1000):
+    """
+    Compute lambda_2/|E| for a given graph (src.graph.Graph or networkx).
+    Above `threshold` nodes, only lambda_2 is computed, on the sparse Laplacian.
+    """
+    if isinstance(graph, nx.Graph):
+        graph = Graph.from_networkx(graph)
     m = graph.number_of_edges()
-    laplacian = nx.laplacian_matrix(graph).toarray()
-    eigenvalues = np.sort(np.linalg.eigvalsh(laplacian))
-    lambda_2 = eigenvalues[1]
+    laplacian = graph.laplacian()
+    if graph.number_of_nodes() <= threshold:
+        eigenvalues = np.sort(np.linalg.eigvalsh(laplacian.toarray()))
+        lambda_2 = eigenvalues[1]
+    else:
+        lambda_2 = fiedler_value(laplacian)
     return lambda_2 / m
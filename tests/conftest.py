@@ -0,0 +1,62 @@
+import copy
+import os
+import sys
+import pytest
+from omegaconf import OmegaConf
+import run_experiments
+from src.store import open_results
+
+# a small experiment, run in a few seconds
+BASE_CONFIG = {
+    "experiment": {"seed": 0, "n_trials": 4, "horizon": 300, "engine": "loop"},
+    "path": {"folder": "test", "output": "results.pkl"},
+    "data": {"type": "arange", "n": 20},
+    "graph": "Watts-Strogatz",
+    "ranking": "All",
+    "evaluation": {"policy": "dense"},
+}
+
+
+def make_config(folder, **sections):
+    """BASE_CONFIG saved to `folder`, with its sections updated by `sections`."""
+    config = copy.deepcopy(BASE_CONFIG)
+    config["path"]["folder"] = folder
+    for name, value in sections.items():
+        if isinstance(value, dict):
+            config.setdefault(name, {}).update(value)
+        else:
+            config[name] = value
+    return config
+
+
+@pytest.fixture
+def run_experiment(tmp_path, monkeypatch):
+    """
+    Function running run_experiments.py on a config dict, with the given
+    command line arguments, in a temporary directory, and returning its
+    results as a dict.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("configs", exist_ok=True)
+
+    def run(config, *args):
+        name = config["path"]["folder"]
+        OmegaConf.save(
+            OmegaConf.create(config), os.path.join("configs", f"{name}.yaml")
+        )
+        argv = ["run_experiments.py", "--exp_name", name, *args]
+        monkeypatch.setattr(sys, "argv", argv)
+        run_experiments.main()
+        path = os.path.join("results", "outputs", name, "results.pkl")
+        with open_results(path) as results:
+            return results.to_dict()
+
+    return run
+
+
+def assert_same_results(a, b):
+    """Same estimators, error curves and final errors in two results."""
+    assert a["names"] == b["names"]
+    for key in ["mean_relative_error", "std_relative_error", "error_mean"]:
+        for name in a["names"]:
+            assert (a[key][name] == b[key][name]).all(), (key, name)
@@ -0,0 +1,88 @@
+import pytest
+from conftest import assert_same_results, make_config
+from src.checkpoint import BlockCheckpoint
+
+# 4 trials in 2 blocks, with an in-flight checkpoint at every step
+EXPERIMENT = {"block_size": 2}
+CHECKPOINT = {"every": 1e-9, "states": False}
+
+
+class Interrupt(Exception):
+    pass
+
+
+def interrupt_after(monkeypatch, saves):
+    """Interrupt the run after its `saves`-th in-flight checkpoint."""
+    save = BlockCheckpoint.save
+    count = [0]
+
+    def interrupted(self, state):
+        save(self, state)
+        count[0] += 1
+        if count[0] == saves:
+            raise Interrupt
+
+    monkeypatch.setattr(BlockCheckpoint, "save", interrupted)
+    return lambda: monkeypatch.setattr(BlockCheckpoint, "save", save)
+
+
+def run_interrupted(run_experiment, monkeypatch, capsys, config, saves):
+    """Results of a run interrupted, then resumed from its last checkpoint."""
+    restore = interrupt_after(monkeypatch, saves)
+    with pytest.raises(Interrupt):
+        run_experiment(config, "--resume")
+    restore()
+    capsys.readouterr()
+    results = run_experiment(config, "--resume")
+    assert "from their last checkpoint" in capsys.readouterr().out
+    return results
+
+
+# interruptions in the first block, then in the second one: the loop engine
+# saves at each step of each trial, the batched engine at each step of a block
+INTERRUPTIONS = [("loop", 450), ("loop", 700), ("batched", 150), ("batched", 450)]
+
+
+@pytest.mark.parametrize("engine, saves", INTERRUPTIONS)
+def test_resume_matches_uninterrupted_run(
+    run_experiment, monkeypatch, capsys, engine, saves
+):
+    experiment = {**EXPERIMENT, "engine": engine}
+    expected = run_experiment(make_config("full", experiment=experiment))
+    config = make_config("resumed", experiment=experiment, checkpoint=CHECKPOINT)
+    resumed = run_interrupted(run_experiment, monkeypatch, capsys, config, saves)
+    assert_same_results(expected, resumed)
+
+
+@pytest.mark.parametrize("engine", ["loop", "batched"])
+def test_extension_keeps_the_previous_curves(run_experiment, engine):
+    checkpoint = {**CHECKPOINT, "states": True}
+    experiment = {**EXPERIMENT, "engine": engine, "horizon": 150}
+    config = make_config("extended", experiment=experiment, checkpoint=checkpoint)
+    short = run_experiment(config)
+    config["experiment"]["horizon"] = 300
+    extended = run_experiment(config, "--resume")
+    for name in short["names"]:
+        curve = extended["mean_relative_error"][name]
+        assert len(curve) == 300
+        assert (curve[:150] == short["mean_relative_error"][name]).all()
+
+
+@pytest.mark.parametrize("engine", ["loop", "batched"])
+def test_interrupted_extension_matches_extension(
+    run_experiment, monkeypatch, capsys, engine
+):
+    checkpoint = {**CHECKPOINT, "states": True}
+    experiment = {**EXPERIMENT, "engine": engine, "horizon": 150}
+    results = []
+    for name, saves in [("extended", None), ("interrupted", 200)]:
+        config = make_config(name, experiment=experiment, checkpoint=checkpoint)
+        run_experiment(config)
+        config["experiment"]["horizon"] = 300
+        if saves is None:
+            results.append(run_experiment(config, "--resume"))
+        else:
+            results.append(
+                run_interrupted(run_experiment, monkeypatch, capsys, config, saves)
+            )
+    assert_same_results(*results)
@@ -0,0 +1,30 @@
+import pytest
+from conftest import assert_same_results, make_config
+
+CASES = {
+    "ranking": {"ranking": "All"},
+    "async": {"ranking": "Async"},
+    "averaging": {"task": "averaging", "trimming": {"alpha": 0.2}},
+}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_batched_engine_matches_loop_engine(run_experiment, case):
+    loop = run_experiment(make_config(f"{case}_loop", **CASES[case]))
+    batched = run_experiment(
+        make_config(f"{case}_batched", experiment={"engine": "batched"}, **CASES[case])
+    )
+    assert (loop["true_ranks"] == batched["true_ranks"]).all()
+    assert_same_results(loop, batched)
+
+
+def test_batched_engine_matches_loop_engine_on_sparse_times(run_experiment):
+    evaluation = {"policy": "log", "num": 30}
+    loop = run_experiment(make_config("log_loop", evaluation=evaluation))
+    batched = run_experiment(
+        make_config(
+            "log_batched", evaluation=evaluation, experiment={"engine": "batched"}
+        )
+    )
+    assert (loop["timesteps"] == batched["timesteps"]).all()
+    assert_same_results(loop, batched)
@@ -0,0 +1,16 @@
+import pytest
+from src.graph import Graph, clustered_edges, generate_graph
+
+
+@pytest.mark.parametrize(
+    "n, clusters, intra_prob", [(2000, 20, 0.01), (500, 1, 0.001), (300, 3, 0.3)]
+)
+def test_clustered_graphs_are_connected(n, clusters, intra_prob):
+    edges = clustered_edges(n, clusters, intra_prob, inter_edges=5, seed=0)
+    assert Graph(n, edges).is_connected()
+    assert (edges[:, 0] < edges[:, 1]).all()
+
+
+def test_disconnected_graphs_fail():
+    with pytest.raises(ValueError):
+        generate_graph(50, "Watts-Strogatz", 0, {"k": 0, "p": 0.0}, attempts=2)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from src.batch import BatchGoRankEstimate
+from src.graph import generate_graph
+from src.rank import GoRankEstimate
+from src.schedule import EdgeSchedule
+
+N, HORIZON = 20, 400
+
+
+def reference_ranking(data, pairs):
+    """
+    Rank estimates of GoRank at every step, as the running average of the
+    comparisons of all nodes with their auxiliary observations, recomputed
+    in O(n) per step.
+    """
+    y_data = data.copy()
+    ranking = np.zeros(len(data))
+    rankings = [ranking]
+    for t, (i, j) in enumerate(pairs, start=1):
+        ranking = ((t - 1) * ranking + (data > y_data)) / t
+        y_data[[i, j]] = y_data[[j, i]]
+        rankings.append(ranking)
+    return np.array(rankings)
+
+
+def inputs(seed, graph_type="Watts-Strogatz"):
+    rng = np.random.default_rng(seed)
+    graph = generate_graph(N, graph_type, seed)
+    data = rng.permutation(N) + 1.0
+    pairs = EdgeSchedule.sample(graph.edges, HORIZON - 1, rng).pairs
+    return data, pairs
+
+
+@pytest.mark.parametrize("graph_type", ["Watts-Strogatz", "Complete", "Cycle"])
+def test_lazy_gorank_matches_recomputed_average(graph_type):
+    data, pairs = inputs(0, graph_type)
+    expected = reference_ranking(data, pairs.tolist())
+    estimate = GoRankEstimate(HORIZON, N, data)
+    for t, (i, j) in enumerate(pairs.tolist(), start=1):
+        estimate.update(t, i, j)
+        np.testing.assert_allclose(estimate.ranking, expected[t], atol=1e-12)
+    np.testing.assert_allclose(estimate.historical_ranking.values, expected, atol=1e-12)
+
+
+def test_batched_lazy_gorank_matches_recomputed_average():
+    draws = [inputs(seed) for seed in range(3)]
+    datas = np.stack([data for data, _ in draws])
+    pairs = np.stack([pairs for _, pairs in draws])
+    estimate = BatchGoRankEstimate(HORIZON, N, datas)
+    for t in range(1, HORIZON):
+        estimate.update(t, pairs[:, t - 1, 0, None], pairs[:, t - 1, 1, None])
+    for trial, (data, trial_pairs) in enumerate(draws):
+        expected = reference_ranking(data, trial_pairs.tolist())[-1]
+        np.testing.assert_allclose(estimate.ranking[trial], expected, atol=1e-12)
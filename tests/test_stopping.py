@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.stats import trim_mean
+from src.batch import BatchGoRankEstimate, BatchMeanEstimate
+from src.graph import generate_graph
+from src.history import snapshot_times
+from src.metrics import TrimError
+from src.rank import GoRankEstimate
+from src.schedule import EdgeSchedule
+from src.stopping import EarlyStopping
+from src.trim import MeanEstimate
+
+N, HORIZON, ALPHA, TRIALS = 20, 3000, 0.2, 2
+STOPPING = {"every": 100, "window": 200, "tol": 0.05}
+
+
+def inputs(seed):
+    rng = np.random.default_rng(seed)
+    graph = generate_graph(N, "Watts-Strogatz", seed)
+    data = rng.permutation(N) + 1.0
+    data[:2] *= 10  # outliers, so that the error does not vanish
+    pairs = EdgeSchedule.sample(graph.edges, HORIZON - 1, rng).pairs
+    return data, np.full(N, trim_mean(data, ALPHA)), pairs
+
+
+def check_padding(curve, stop):
+    values = curve.values[curve.times >= stop]
+    assert np.all(values > 0)
+    np.testing.assert_array_equal(values, values[0])
+
+
+@pytest.mark.parametrize("policy", ["dense", "strided"])
+def test_gotrim_curve_after_stop(policy):
+    data, target, pairs = inputs(0)
+    times = snapshot_times(HORIZON, policy, every=100)
+    estimate = MeanEstimate(HORIZON, N, data, ALPHA, GoRankEstimate)
+    metric = TrimError(estimate, target, times)
+    rule = EarlyStopping(metric, **STOPPING)
+    for t, (i, j) in enumerate(pairs.tolist(), start=1):
+        estimate.rank.update(t, i, j)
+        estimate.update_mean(t, i, j)
+        metric.update(t, i, j)
+        if t % STOPPING["every"] == 0 and rule.check(t):
+            break
+    assert 0 < rule.stop < HORIZON - 1
+    rule.finish(HORIZON)
+    check_padding(metric.curve, rule.stop)
+
+
+def test_batched_gotrim_curve_after_stop():
+    draws = [inputs(seed) for seed in range(TRIALS)]
+    datas, targets, pairs = (np.stack(arrays) for arrays in zip(*draws))
+    times = snapshot_times(HORIZON, "dense")
+    estimate = BatchMeanEstimate(HORIZON, N, datas, ALPHA, BatchGoRankEstimate)
+    metric = TrimError(estimate, targets, times)
+    rule = EarlyStopping(metric, **STOPPING)
+    for t in range(1, HORIZON):
+        i, j = pairs[:, t - 1, 0, None], pairs[:, t - 1, 1, None]
+        estimate.rank.update(t, i, j)
+        estimate.update_mean(t, i, j)
+        metric.update(t, i, j)
+        if t % STOPPING["every"] == 0 and rule.check(t):
+            break
+    stops = rule.stop.copy()
+    assert np.any(stops >= 0)
+    rule.finish(HORIZON)
+    for trial in range(TRIALS):
+        if stops[trial] >= 0:
+            values = metric.curve.values[times >= stops[trial], trial]
+            assert np.all(values > 0)
+            np.testing.assert_array_equal(values, values[0])
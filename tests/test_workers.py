@@ -0,0 +1,34 @@
+import pytest
+from conftest import assert_same_results, make_config
+
+# blocks of 2 of the 5 trials, the last one incomplete
+EXPERIMENT = {"n_trials": 5, "block_size": 2}
+
+
+@pytest.mark.parametrize("engine", ["loop", "batched"])
+def test_results_do_not_depend_on_workers(run_experiment, engine):
+    experiment = {**EXPERIMENT, "engine": engine}
+    results = [
+        run_experiment(
+            make_config(f"{engine}_{workers}", experiment=experiment),
+            "--workers",
+            str(workers),
+        )
+        for workers in [1, 2, 3]
+    ]
+    for other in results[1:]:
+        assert_same_results(results[0], other)
+
+
+def test_results_do_not_depend_on_the_block_size(run_experiment):
+    # every trial draws from its own stream, whichever block runs it; only
+    # the merge of the running means changes, up to rounding
+    blocks = run_experiment(make_config("blocks_2", experiment=EXPERIMENT))
+    block = run_experiment(
+        make_config("blocks_5", experiment={**EXPERIMENT, "block_size": 5})
+    )
+    for name in blocks["names"]:
+        difference = abs(
+            blocks["mean_relative_error"][name] - block["mean_relative_error"][name]
+        )
+        assert difference.max() <= 1e-12